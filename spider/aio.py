@@ -0,0 +1,80 @@
+"""
+This module handles running blocking database operations from asyncio code.
+
+Operations run on a bounded thread pool so they never block the event loop. The context of
+the calling task (e.g. its active Session) is copied into the worker thread, and the context
+variables the operation sets are applied back to the task, as if it had run in the task.
+
+Functions:
+- set_async_executor(executor): Sets the executor used by the async model methods.
+- get_async_executor(): Returns the executor used by the async model methods.
+- run_sync(func, *args, **kwargs): Runs a blocking function on the executor and awaits its result.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+_executor = None
+_MISSING = object()
+_executor_lock = Lock()
+
+# Each worker opens its own connection, so the pool size bounds the number of concurrent connections.
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+def set_async_executor(executor):
+    """
+    Sets the executor used by the async model methods.
+
+    Args:
+    - executor (concurrent.futures.Executor): A bounded thread pool executor.
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def get_async_executor():
+    """
+    Returns the executor used by the async model methods, creating a thread pool with
+    DEFAULT_MAX_WORKERS workers if none was set.
+
+    Returns:
+    - concurrent.futures.Executor: The executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix='spider-async')
+        return _executor
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Runs a blocking function on the executor, in a copy of the current context, and awaits its result.
+
+    The context variables the function leaves changed, such as the time of the last write
+    recorded by a sticky ReplicaRouter, are set in the calling task once it returns.
+
+    Args:
+    - func (callable): The blocking function.
+    - args: Positional arguments for the function.
+    - kwargs: Keyword arguments for the function.
+
+    Returns:
+    - The value returned by the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    before = dict(context)
+    call = functools.partial(context.run, func, *args, **kwargs)
+    try:
+        return await loop.run_in_executor(get_async_executor(), call)
+    finally:
+        for var, value in context.items():
+            if before.get(var, _MISSING) is not value:
+                var.set(value)
@@ -0,0 +1,138 @@
+"""
+This module handles write-behind buffering of model instances.
+
+Classes:
+- BufferedWriter: Queues instances in memory and inserts them in bulk from a background thread.
+"""
+
+import atexit
+import queue
+import threading
+import time
+
+_STOP = object()
+_FLUSH = object()
+
+
+class BufferedWriter:
+    """
+    Queues model instances in memory and inserts them in bulk from a background thread.
+
+    Meant for append-only models (events, logs, telemetry) whose inserts do not need to be
+    synchronous. Instances are written with bulk_create once batch_size instances are queued
+    or flush_interval seconds have passed since the first one. When max_size instances are
+    waiting, add() blocks until the background thread catches up. Pending instances are
+    written when the writer is closed, including at interpreter shutdown.
+
+    Attributes:
+    - model (Model): The model instance used to write the batches.
+    - batch_size (int): The maximum number of instances written per bulk insert.
+    - flush_interval (float): The maximum time, in seconds, an instance waits in the buffer.
+    - on_error (callable): Called with the exception and the batch when a bulk insert fails.
+
+    Example:
+        >>> with Event().buffered(batch_size=1000) as events:
+        ...     events.add(Event(name='click'))
+    """
+
+    def __init__(self, model, max_size=10000, batch_size=500, flush_interval=1.0, on_error=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self._queue = queue.Queue(maxsize=max_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='spider-buffered-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, instance, timeout=None):
+        """
+        Queues an instance to be inserted.
+
+        Args:
+        - instance (Model): The instance to insert.
+        - timeout (float, optional): The maximum time, in seconds, to wait for room in the buffer.
+          If None, waits as long as needed.
+
+        Raises:
+        - RuntimeError: If the writer is closed or its background thread has stopped.
+        - queue.Full: If the buffer is still full after timeout seconds.
+        """
+        self._check_running()
+        self._queue.put(instance, timeout=timeout)
+
+    def flush(self):
+        """
+        Writes the queued instances without waiting for flush_interval, and waits until they are written.
+
+        Raises:
+        - RuntimeError: If the writer is closed or its background thread has stopped.
+        """
+        self._check_running()
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        """
+        Writes the queued instances and stops the background thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _check_running(self):
+        if self._closed:
+            raise RuntimeError("The buffered writer is closed.")
+        if not self._thread.is_alive():
+            raise RuntimeError("The background thread of the buffered writer has stopped.")
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP or item is _FLUSH:
+                self._queue.task_done()
+                stop = item is _STOP
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP or item is _FLUSH:
+                    self._queue.task_done()
+                    stop = item is _STOP
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self.model.bulk_create(batch)
+        except Exception as e:
+            if self.on_error is None:
+                print(f"Failed to write {len(batch)} buffered records: {e}")
+                return
+            try:
+                self.on_error(e, batch)
+            except Exception as handler_error:
+                # The background thread must survive a failing handler, or the buffer stops draining.
+                print(f"Failed to write {len(batch)} buffered records: {e}; on_error raised: {handler_error}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
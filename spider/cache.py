@@ -0,0 +1,171 @@
+"""
+This module handles the caching of query results.
+
+Classes:
+- BaseCache: Interface for query result cache backends.
+- LocalCache: In-process LRU cache with optional time-to-live.
+
+A cache is enabled per model through the MetaData inner class:
+
+    class Product(Model):
+        ...
+        class MetaData:
+            cache = LocalCache(maxsize=1024, ttl=60)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class BaseCache:
+    """
+    Interface for query result cache backends.
+
+    Entries are keyed by the compiled SQL statement and its parameters, and are tagged with
+    the tables they were read from so that any write to one of those tables invalidates them.
+    Shared backends (e.g. Redis, Memcached) implement the same methods.
+
+    A read racing a write must not cache what it read before the write: the version of the
+    tables is taken before the read and passed to set(), which skips the value if one of the
+    tables was invalidated in the meantime.
+
+    Methods:
+    - get(key): Returns the cached value for a key, or None.
+    - version(tables): Returns a token identifying the current state of the given tables.
+    - set(key, value, tables, version): Stores a value read from the given tables.
+    - invalidate(table): Drops every entry read from a table.
+    - clear(): Drops every entry.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def version(self, tables):
+        return None
+
+    def set(self, key, value, tables, version=None):
+        raise NotImplementedError
+
+    def invalidate(self, table):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCache(BaseCache):
+    """
+    In-process LRU cache with optional time-to-live. Safe to share between threads.
+
+    Invalidation only reaches the current process, so use a shared backend when several
+    processes write to the same database.
+
+    Attributes:
+    - maxsize (int): Maximum number of entries kept; the least recently used is evicted first.
+    - ttl (float): Number of seconds an entry stays valid, or None to keep it until invalidated.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tables = {}
+        self._versions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value for a key.
+
+        Args:
+        - key: The cache key.
+
+        Returns:
+        - The cached value, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, tables = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def version(self, tables):
+        """
+        Returns a token identifying the current state of the given tables, to be taken before a read.
+
+        Args:
+        - tables (iterable): The tables about to be read.
+
+        Returns:
+        - tuple: The token, changed by any later invalidation of one of the tables.
+        """
+        with self._lock:
+            return self._version(tables)
+
+    def set(self, key, value, tables, version=None):
+        """
+        Stores a value read from the given tables.
+
+        Args:
+        - key: The cache key.
+        - value: The value to cache.
+        - tables (iterable): The tables the value was read from.
+        - version (tuple, optional): The token returned by version() before the read. If one of
+          the tables was invalidated since, the value may be stale and is not stored.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        tables = tuple(tables)
+        with self._lock:
+            if version is not None and version != self._version(tables):
+                return
+            self._discard(key)
+            self._entries[key] = (expires_at, value, tables)
+            for table in tables:
+                self._tables.setdefault(table, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, table):
+        """
+        Drops every entry read from a table.
+
+        Args:
+        - table (str): The table name.
+        """
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            for key in list(self._tables.pop(table, ())):
+                self._discard(key)
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tables.clear()
+
+    def _version(self, tables):
+        return (self._generation, *(self._versions.get(table, 0) for table in tables))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._tables.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tables[table]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,214 @@
+"""
+This module handles SQL expressions computed by the database, and composable filter criteria.
+
+Expressions are used as values in update() and filter(), so that a value depending on a
+column is computed by the database in the same statement, e.g.
+Product().update(views=F('views') + 1, id=1) increments a counter without reading it first.
+
+Classes:
+- Expression: The base class of expressions, supporting arithmetic operators.
+- F: A reference to a column of the row.
+- Value: A literal value, bound as a parameter.
+- CombinedExpression: An arithmetic operation between two expressions.
+- Coalesce: The first of its expressions that is not NULL.
+- Q: Filter criteria composable with | (OR), & (AND) and ~ (NOT).
+
+Functions:
+- compile_expression(value, placeholder): Compiles an expression or a plain value into SQL.
+"""
+
+import re
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class Expression:
+    """
+    The base class of expressions.
+
+    Expressions can be combined with +, -, * and / with other expressions or plain values.
+    """
+
+    def as_sql(self, placeholder):
+        """
+        Compiles the expression into SQL.
+
+        Args:
+        - placeholder (str): The parameter placeholder of the database, '?' or '%s'.
+
+        Returns:
+        - tuple: A tuple containing the SQL fragment and its list of values.
+        """
+        raise NotImplementedError
+
+    def _combine(self, operator, other, reverse=False):
+        other = other if isinstance(other, Expression) else Value(other)
+        if reverse:
+            return CombinedExpression(other, operator, self)
+        return CombinedExpression(self, operator, other)
+
+    def __add__(self, other):
+        return self._combine('+', other)
+
+    def __radd__(self, other):
+        return self._combine('+', other, reverse=True)
+
+    def __sub__(self, other):
+        return self._combine('-', other)
+
+    def __rsub__(self, other):
+        return self._combine('-', other, reverse=True)
+
+    def __mul__(self, other):
+        return self._combine('*', other)
+
+    def __rmul__(self, other):
+        return self._combine('*', other, reverse=True)
+
+    def __truediv__(self, other):
+        return self._combine('/', other)
+
+    def __rtruediv__(self, other):
+        return self._combine('/', other, reverse=True)
+
+
+class F(Expression):
+    """
+    A reference to a column of the row.
+
+    Attributes:
+    - name (str): The column name.
+    """
+
+    def __init__(self, name):
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"{name} is not a valid column name.")
+        self.name = name
+
+    def as_sql(self, placeholder):
+        return self.name, []
+
+    def __repr__(self):
+        return f"F({self.name!r})"
+
+
+class Value(Expression):
+    """
+    A literal value, bound as a parameter.
+
+    Attributes:
+    - value: The value.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def as_sql(self, placeholder):
+        return placeholder, [self.value]
+
+    def __repr__(self):
+        return f"Value({self.value!r})"
+
+
+class CombinedExpression(Expression):
+    """
+    An arithmetic operation between two expressions.
+
+    Attributes:
+    - lhs (Expression): The left operand.
+    - operator (str): The operator, one of '+', '-', '*' and '/'.
+    - rhs (Expression): The right operand.
+    """
+
+    def __init__(self, lhs, operator, rhs):
+        self.lhs = lhs
+        self.operator = operator
+        self.rhs = rhs
+
+    def as_sql(self, placeholder):
+        lhs, lhs_values = self.lhs.as_sql(placeholder)
+        rhs, rhs_values = self.rhs.as_sql(placeholder)
+        return f"({lhs} {self.operator} {rhs})", lhs_values + rhs_values
+
+
+class Coalesce(Expression):
+    """
+    The first of its expressions that is not NULL.
+
+    Plain values are bound as parameters, e.g. Coalesce(F('views'), 0) + 1.
+
+    Attributes:
+    - expressions (list): The expressions, in order.
+    """
+
+    def __init__(self, *expressions):
+        if len(expressions) < 2:
+            raise ValueError("Coalesce requires at least two expressions.")
+        self.expressions = [expression if isinstance(expression, Expression) else Value(expression) for expression in expressions]
+
+    def as_sql(self, placeholder):
+        fragments = []
+        values = []
+        for expression in self.expressions:
+            fragment, fragment_values = expression.as_sql(placeholder)
+            fragments.append(fragment)
+            values.extend(fragment_values)
+        return f"COALESCE({', '.join(fragments)})", values
+
+
+class Q:
+    """
+    Filter criteria composable with | (OR), & (AND) and ~ (NOT).
+
+    Keyword arguments take the same lookups as filter() and are joined with AND. Q objects are
+    passed to filter(), get() and count() as positional arguments and compiled with the keyword
+    criteria into a single WHERE clause, e.g.
+    filter(Q(name__startswith='A') | ~Q(age__lt=18), active=True).
+
+    Attributes:
+    - children (list): The nested Q objects and (lookup, value) pairs.
+    - connector (str): How the children are joined, 'AND' or 'OR'.
+    - negated (bool): Whether the whole criteria is negated.
+    """
+
+    AND = 'AND'
+    OR = 'OR'
+
+    def __init__(self, *children, connector=AND, negated=False, **kwargs):
+        self.children = [*children, *kwargs.items()]
+        self.connector = connector
+        self.negated = negated
+
+    def _combine(self, other, connector):
+        if not isinstance(other, Q):
+            raise TypeError(f"Cannot combine a Q object with {type(other).__name__}.")
+        return Q(self, other, connector=connector)
+
+    def __or__(self, other):
+        return self._combine(other, Q.OR)
+
+    def __and__(self, other):
+        return self._combine(other, Q.AND)
+
+    def __invert__(self):
+        return Q(*self.children, connector=self.connector, negated=not self.negated)
+
+    def __repr__(self):
+        prefix = 'NOT ' if self.negated else ''
+        return f"<Q: {prefix}({self.connector}: {self.children!r})>"
+
+
+def compile_expression(value, placeholder):
+    """
+    Compiles an expression, or a plain value bound as a parameter, into SQL.
+
+    Args:
+    - value: An Expression or a plain value.
+    - placeholder (str): The parameter placeholder of the database, '?' or '%s'.
+
+    Returns:
+    - tuple: A tuple containing the SQL fragment and its list of values.
+    """
+    if isinstance(value, Expression):
+        return value.as_sql(placeholder)
+    return placeholder, [value]
@@ -20,9 +20,14 @@ Classes:
 - TextField: Represents a text field for large text data.
 - PasswordField: Represents a password field with hashing and salting.
 - EmailField: Represents an email field.
+- JSONField: Represents a JSON document field.
+- BinaryField: Represents a binary data field.
 - ManyToManyField: Represents a many-to-many relationship to another model.
 """
 
+import lzma
+import zlib
+
 from spider.validators.fields_validations import (
     validate_boolean, validate_choices,
     validate_date, validate_datetime,
@@ -31,7 +36,8 @@ from spider.validators.fields_validations import (
     validate_integer, validate_null,
     validate_string, validate_url,
     validate_email, validate_time,
-    validate_password
+    validate_password, validate_json,
+    validate_binary
 )
 
 
@@ -466,14 +472,16 @@ class ForeignKey(Field):
 
     Attributes:
     - to (Type): The model to which this field is related.
+    - related_name (str): The name of the reverse relationship. Defaults to '<model>_set'.
 
     Methods:
     - validate(value): Validates the foreign key value.
     """
 
-    def __init__(self, to, primary_key=False, null=True, unique=False, default=None):
+    def __init__(self, to, primary_key=False, null=True, unique=False, default=None, related_name=None):
         super().__init__(primary_key, null, unique, default)
         self.to = to
+        self.related_name = related_name
 
     def validate(self, value):
         """
@@ -493,16 +501,92 @@ class ForeignKey(Field):
         return value
 
 
+# Prefixes marking compressed TextField values, by algorithm.
+COMPRESSION_PREFIXES = {'zlib': b'\x00Z', 'lzma': b'\x00X'}
+
+
 class TextField(CharField):
     """
     Represents a text field for large text data.
 
+    With compress enabled, values of at least threshold bytes (in UTF-8) are stored compressed,
+    as bytes starting with a prefix naming the algorithm, and shorter values are stored as text.
+    Values are decompressed when rows are read. Model.compact() compresses the values written
+    before compression was enabled.
+
+    Attributes:
+    - compress (bool): Whether large values are stored compressed.
+    - algorithm (str): The compression algorithm, 'zlib' or 'lzma'.
+    - threshold (int): The size, in bytes, from which values are compressed.
+
     Methods:
     - validate(value): Validates the text value.
+    - encode(value): Returns the value as stored in the database.
+    - decode(value): Returns the text of a stored value.
+    - is_compressed(value): Checks whether a stored value is compressed.
     """
 
-    def __init__(self, max_length, primary_key=False, null=True, unique=False, default=None):
+    def __init__(self, max_length, primary_key=False, null=True, unique=False, default=None, compress=False, algorithm='zlib', threshold=1024):
         super().__init__(max_length, primary_key, null, unique, default)
+        if algorithm not in COMPRESSION_PREFIXES:
+            raise ValueError(f"Unsupported compression algorithm: {algorithm}. Choose one of {list(COMPRESSION_PREFIXES)}.")
+        self.compress = compress
+        self.algorithm = algorithm
+        self.threshold = threshold
+
+    def encode(self, value):
+        """
+        Returns the value as stored in the database, compressed if it is large enough.
+
+        Args:
+        - value (str): The text.
+
+        Returns:
+        - str or bytes: The text, or its compressed form.
+        """
+        if not self.compress or not isinstance(value, str):
+            return value
+        data = value.encode()
+        if len(data) < self.threshold:
+            return value
+        compressed = zlib.compress(data) if self.algorithm == 'zlib' else lzma.compress(data)
+        return COMPRESSION_PREFIXES[self.algorithm] + compressed
+
+    def decode(self, value):
+        """
+        Returns the text of a stored value, decompressing it if needed.
+
+        Values compressed with either algorithm are decoded, whatever the field's current algorithm.
+
+        Args:
+        - value (str or bytes): The stored value.
+
+        Returns:
+        - str: The text.
+        """
+        if not isinstance(value, (bytes, bytearray)):
+            return value
+        prefix, data = bytes(value[:2]), value[2:]
+        if prefix == COMPRESSION_PREFIXES['zlib']:
+            return zlib.decompress(data).decode()
+        if prefix == COMPRESSION_PREFIXES['lzma']:
+            return lzma.decompress(data).decode()
+        return bytes(value).decode()
+
+    def is_compressed(self, value):
+        """
+        Checks whether a stored value is compressed.
+
+        Plain text may be stored as bytes too, e.g. when MySQL returns a LONGBLOB column, so
+        compressed values are recognized by their prefix.
+
+        Args:
+        - value (str or bytes): The stored value.
+
+        Returns:
+        - bool: True if the value starts with the prefix of a compression algorithm.
+        """
+        return isinstance(value, (bytes, bytearray)) and bytes(value[:2]) in COMPRESSION_PREFIXES.values()
 
     def validate(self, value):
         """
@@ -530,19 +614,34 @@ class PasswordField(CharField):
     - hash_name (str): The hashing algorithm used.
     - salt_size (int): The size of the salt used for hashing.
     - iterations (int): The number of hashing iterations.
+    - legacy_iterations (int): The configured number of iterations, kept through calibrate(), with
+      which the hashes stored without parameters were made.
     - salt (bytes): The salt used for hashing.
+    - algorithm (str): The key derivation function, 'pbkdf2' or 'scrypt'.
+    - n, r, p (int): The scrypt cost, block size and parallelization factor.
 
     Methods:
     - validate(value): Validates and hashes the password value.
+    - params(): Returns the encoded hashing parameters.
+    - calibrate(target_ms): Adjusts the work factor to the given hashing latency on this host.
+    - verify(instance, candidate): Verifies a password against the stored hash.
+
+    Hashing runs on the executor configured with spider.hashers.set_hashing_executor,
+    using a fresh salt of salt_size bytes for every password.
     """
 
-    def __init__(self, hash_name='sha256', salt_size=16, iterations=10e5, max_length=32, primary_key=False, null=True, unique=False, default=None):
+    def __init__(self, hash_name='sha256', salt_size=16, iterations=10e5, max_length=32, primary_key=False, null=True, unique=False, default=None, algorithm='pbkdf2', n=2 ** 14, r=8, p=1):
         super().__init__(max_length, primary_key, null, unique, default)
         import os
         self.hash = hash_name
         self.salt_size = salt_size
         self.salt = os.urandom(salt_size)
         self.iterations = int(iterations)
+        self.legacy_iterations = self.iterations
+        self.algorithm = algorithm
+        self.n = n
+        self.r = r
+        self.p = p
 
     def validate(self, value):
         """
@@ -561,6 +660,83 @@ class PasswordField(CharField):
         value = validate_password(value, self.hash, self.salt, self.max_length)
         return value
 
+    def params(self):
+        """
+        Returns the encoded hashing parameters, stored as the prefix of every hash.
+
+        Returns:
+        - str: 'pbkdf2_<hash_name>$<iterations>' or 'scrypt$<n>$<r>$<p>'.
+        """
+        if self.algorithm == 'scrypt':
+            return f"scrypt${self.n}${self.r}${self.p}"
+        return f"pbkdf2_{self.hash}${self.iterations}"
+
+    def calibrate(self, target_ms=250):
+        """
+        Benchmarks the key derivation function on this host and adjusts the work factor
+        so that hashing a password takes about target_ms.
+
+        Stored hashes made with the previous work factor are rehashed on the next
+        successful verify.
+
+        Args:
+        - target_ms (float): The target hashing latency, in milliseconds.
+
+        Returns:
+        - PasswordField: The field itself.
+        """
+        from spider.hashers import calibrate_pbkdf2, calibrate_scrypt
+
+        if self.algorithm == 'scrypt':
+            self.n = calibrate_scrypt(target_ms, self.r, self.p)
+        else:
+            self.iterations = calibrate_pbkdf2(target_ms, self.hash)
+        return self
+
+    def verify(self, instance, candidate):
+        """
+        Verifies a password against the hash stored for a record.
+
+        The hash is read with a single primary key lookup on the passwords table, and the
+        candidate is hashed on the hashing executor after the connection is released and
+        compared in constant time. If the stored hash was made with other parameters than
+        the field's current ones, it is transparently replaced.
+
+        Args:
+        - instance (Model or dict): The saved model instance or the row returned by get/filter.
+        - candidate (str): The password to verify.
+
+        Returns:
+        - bool: True if the password matches.
+        """
+        from spider.hashers import check_password, make_passwords
+        from spider.sql_utils import TableSQL
+
+        model = instance if not isinstance(instance, dict) else self.model()
+        if isinstance(instance, dict):
+            pk = instance.get(f"{self.name}ID") or instance.get('id')
+        else:
+            pk = instance.__dict__.get('id')
+        if pk is None:
+            return False
+
+        query, values = TableSQL.select_password_sql(model, pk)
+
+        def read(conn):
+            conn.execute(query, values)
+            return conn.fetchone()
+
+        stored = model._rdbms().run_read(read)
+        if stored is None:
+            return False
+
+        matches, needs_rehash = check_password(self, candidate, stored[0], stored[1])
+        if matches and needs_rehash:
+            encoded, salt = make_passwords(self, [candidate])[0]
+            query, values = TableSQL.update_password_sql(model, pk, encoded, salt)
+            model._rdbms().run_write(lambda conn: conn.execute(query, values))
+        return matches
+
 
 class EmailField(CharField):
     """
@@ -592,6 +768,73 @@ class EmailField(CharField):
         return value
 
 
+class JSONField(Field):
+    """
+    Represents a JSON document field.
+
+    Values (dicts, lists, strings, numbers, booleans) are stored serialized as JSON text and
+    returned deserialized. Keys inside the document can be filtered on with path lookups, e.g.
+    filter(data__user__id=5), and declared as indexed generated columns in the model's
+    MetaData, e.g. generated_columns = {'user_id': 'data__user__id'}.
+
+    Methods:
+    - validate(value): Validates the JSON value.
+    """
+
+    def __init__(self, primary_key=False, null=True, unique=False, default=None):
+        super().__init__(primary_key, null, unique, default)
+
+    def validate(self, value):
+        """
+        Validates the JSON value.
+
+        Args:
+        - value: The value to be validated.
+
+        Returns:
+        - value: The validated value.
+
+        Raises:
+        - ValidationError: If the value cannot be serialized to JSON.
+        """
+        value = super().validate(value)
+        value = validate_json(value)
+        return value
+
+
+class BinaryField(Field):
+    """
+    Represents a binary data field, stored as a BLOB inside the database.
+
+    Small values can be set on the instance like any other field. Large values can be streamed
+    in chunks, without being loaded into memory at once, with Model.write_blob, Model.read_blob
+    and Model.open_blob (SQLite only).
+
+    Methods:
+    - validate(value): Validates the binary value.
+    """
+
+    def __init__(self, primary_key=False, null=True, unique=False, default=None):
+        super().__init__(primary_key, null, unique, default)
+
+    def validate(self, value):
+        """
+        Validates the binary value.
+
+        Args:
+        - value: The value to be validated.
+
+        Returns:
+        - value: The validated value, as bytes.
+
+        Raises:
+        - ValidationError: If the value is not bytes-like.
+        """
+        value = super().validate(value)
+        value = validate_binary(value)
+        return value
+
+
 class ManyToManyField(Field):
     """
     Represents a many-to-many relationship to another model.
@@ -602,13 +845,32 @@ class ManyToManyField(Field):
 
     Methods:
     - validate(value): Validates the many-to-many relationship value.
+
+    Accessing the field on a saved model instance returns a ManyToManyManager that adds,
+    removes and sets links in the junction table created along with the model table.
     """
 
     def __init__(self, to, related_name, null=True):
-        super().__init__(null)
+        super().__init__(null=null)
         self.to = to
         self.related_name = related_name
 
+    def __get__(self, instance, owner):
+        """
+        Returns the field itself on the class and a relationship manager on model instances.
+
+        Args:
+        - instance (Model): The model instance the field is accessed on, or None.
+        - owner (Type): The model class.
+
+        Returns:
+        - ManyToManyField or ManyToManyManager: The field, or a manager bound to the instance.
+        """
+        if instance is None:
+            return self
+        from spider.related import ManyToManyManager
+        return ManyToManyManager(instance, self)
+
     def validate(self, value):
         """
         Validates the many-to-many relationship value.
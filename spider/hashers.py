@@ -0,0 +1,220 @@
+"""
+This module handles the hashing of PasswordField values.
+
+Hashing runs on a worker pool instead of the calling thread, so it never happens while a
+database connection or transaction is held. hashlib releases the GIL while hashing, so a
+thread pool hashes several passwords in parallel across cores; a process pool can be
+configured as well.
+
+Hashes are stored encoded with their parameters, e.g. 'pbkdf2_sha256$600000$<hex>' or
+'scrypt$16384$8$1$<hex>', so that a hash made with older parameters can still be verified
+and transparently replaced on the next successful login.
+
+Functions:
+- set_hashing_executor(executor): Sets the executor used to hash passwords.
+- get_hashing_executor(): Returns the executor used to hash passwords.
+- hash_password(password, hash_name, salt, iterations): Hashes a password with PBKDF2.
+- scrypt_password(password, salt, n, r, p): Hashes a password with scrypt.
+- encode_password(params, password, salt): Hashes a password and encodes it with its parameters.
+- make_passwords(field, passwords): Hashes passwords on the executor with fresh salts.
+- check_password(field, candidate, encoded, salt): Verifies a password against an encoded hash.
+- calibrate_pbkdf2(target_ms, hash_name): Picks PBKDF2 iterations taking about target_ms on this host.
+- calibrate_scrypt(target_ms, r, p): Picks a scrypt cost taking about target_ms on this host.
+"""
+
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import pbkdf2_hmac, scrypt
+from threading import Lock
+
+_executor = None
+_executor_lock = Lock()
+
+
+def set_hashing_executor(executor):
+    """
+    Sets the executor used to hash passwords.
+
+    Args:
+    - executor (concurrent.futures.Executor): A thread or process pool executor.
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def get_hashing_executor():
+    """
+    Returns the executor used to hash passwords, creating a thread pool with one worker
+    per CPU if none was set.
+
+    Returns:
+    - concurrent.futures.Executor: The executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='spider-hashing')
+        return _executor
+
+
+def hash_password(password, hash_name, salt, iterations):
+    """
+    Hashes a password with PBKDF2.
+
+    Args:
+    - password (str): The password to hash.
+    - hash_name (str): The hashing algorithm.
+    - salt (bytes): The salt.
+    - iterations (int): The number of iterations.
+
+    Returns:
+    - str: The hexadecimal hash.
+    """
+    return pbkdf2_hmac(
+        hash_name=hash_name,
+        password=password.encode(),
+        salt=salt,
+        iterations=iterations
+    ).hex()
+
+
+def scrypt_password(password, salt, n, r, p):
+    """
+    Hashes a password with scrypt.
+
+    Args:
+    - password (str): The password to hash.
+    - salt (bytes): The salt.
+    - n (int): The CPU/memory cost, a power of two.
+    - r (int): The block size.
+    - p (int): The parallelization factor.
+
+    Returns:
+    - str: The hexadecimal hash.
+    """
+    return scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024).hex()
+
+
+def encode_password(params, password, salt):
+    """
+    Hashes a password and encodes the hash with its parameters.
+
+    Args:
+    - params (str): The encoded parameters, as returned by PasswordField.params().
+    - password (str): The password to hash.
+    - salt (bytes): The salt.
+
+    Returns:
+    - str: The encoded hash, '<params>$<hex>'.
+
+    Raises:
+    - ValueError: If the algorithm is not supported.
+    """
+    algorithm, *settings = params.split('$')
+    if algorithm.startswith('pbkdf2_'):
+        digest = hash_password(password, algorithm.removeprefix('pbkdf2_'), salt, int(settings[0]))
+    elif algorithm == 'scrypt':
+        digest = scrypt_password(password, salt, *(int(setting) for setting in settings))
+    else:
+        raise ValueError(f"Unsupported password algorithm: {algorithm}.")
+    return f"{params}${digest}"
+
+
+def make_passwords(field, passwords):
+    """
+    Hashes passwords on the executor, each with a fresh salt.
+
+    Args:
+    - field (PasswordField): The field defining the hashing parameters.
+    - passwords (list): The passwords to hash.
+
+    Returns:
+    - list: A list of (encoded hash, salt) tuples of strings, in the same order as the passwords.
+    """
+    params = field.params()
+    salts = [os.urandom(field.salt_size) for _ in passwords]
+    executor = get_hashing_executor()
+    futures = [executor.submit(encode_password, params, password, salt) for password, salt in zip(passwords, salts)]
+    return [(future.result(), salt.hex()) for future, salt in zip(futures, salts)]
+
+
+def check_password(field, candidate, encoded, salt):
+    """
+    Verifies a password against an encoded hash, on the executor and in constant time.
+
+    Legacy hashes, stored without parameters, are assumed to use the field's hash name, its
+    configured iterations (legacy_iterations, which calibration does not change) and a
+    single-byte salt stored as its decimal value. They are always reported for rehashing,
+    so they are upgraded on the next successful login.
+
+    Args:
+    - field (PasswordField): The field defining the current hashing parameters.
+    - candidate (str): The password to verify.
+    - encoded (str): The stored hash.
+    - salt (str): The stored hexadecimal salt, or the decimal salt of a legacy hash.
+
+    Returns:
+    - tuple: A tuple containing whether the password matches and whether the hash should be
+      recomputed because it is legacy or the field's parameters changed.
+    """
+    legacy = '$' not in encoded
+    if legacy:
+        params = f"pbkdf2_{field.hash}${field.legacy_iterations}"
+        encoded = f"{params}${encoded}"
+        salt = int(salt).to_bytes(1, 'big')
+    else:
+        params = encoded.rsplit('$', 1)[0]
+        salt = bytes.fromhex(salt)
+    future = get_hashing_executor().submit(encode_password, params, candidate, salt)
+    matches = hmac.compare_digest(future.result().encode(), encoded.encode())
+    return matches, legacy or params != field.params()
+
+
+def calibrate_pbkdf2(target_ms=250, hash_name='sha256'):
+    """
+    Picks the number of PBKDF2 iterations taking about target_ms to hash a password on this host.
+
+    Args:
+    - target_ms (float): The target hashing latency, in milliseconds.
+    - hash_name (str): The hashing algorithm.
+
+    Returns:
+    - int: The number of iterations.
+    """
+    iterations = 10000
+    while True:
+        start = time.perf_counter()
+        hash_password('calibration', hash_name, b'\0' * 16, iterations)
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.05 or iterations >= 10 ** 8:
+            break
+        iterations *= 2
+    return max(1000, int(iterations * (target_ms / 1000) / elapsed))
+
+
+def calibrate_scrypt(target_ms=250, r=8, p=1):
+    """
+    Picks the scrypt cost taking about target_ms to hash a password on this host.
+
+    The cost is the largest power of two whose hashing time does not exceed target_ms,
+    with a minimum of 2 ** 10.
+
+    Args:
+    - target_ms (float): The target hashing latency, in milliseconds.
+    - r (int): The block size.
+    - p (int): The parallelization factor.
+
+    Returns:
+    - int: The scrypt cost n.
+    """
+    n = 2 ** 10
+    while n < 2 ** 24:
+        start = time.perf_counter()
+        scrypt_password('calibration', b'\0' * 16, n * 2, r, p)
+        if (time.perf_counter() - start) * 1000 > target_ms:
+            break
+        n *= 2
+    return n
@@ -0,0 +1,185 @@
+"""
+This module handles the coalescing of primary key lookups into batched queries.
+
+Classes:
+- PendingRecord: A record requested from a BatchLoader and not loaded yet.
+- BatchLoader: Collects primary key lookups and loads them with one 'WHERE id IN (...)' query.
+"""
+
+import asyncio
+
+from spider.aio import run_sync
+from spider.session import Session
+from spider.sql_utils import TableSQL
+
+
+class PendingRecord:
+    """
+    A record requested from a BatchLoader.
+
+    Attributes:
+    - key: The primary key of the requested record.
+
+    Methods:
+    - result(): Returns the record, dispatching the pending lookups of the loader if needed.
+    """
+
+    def __init__(self, loader, key):
+        self._loader = loader
+        self.key = key
+
+    def result(self):
+        """
+        Returns the record, dispatching the pending lookups of the loader if needed.
+
+        Returns:
+        - dict: The record matching the primary key.
+
+        Raises:
+        - ValueError: If no matching record is found.
+        """
+        if self.key not in self._loader._loaded:
+            self._loader.dispatch()
+        return self._loader._record(self.key)
+
+
+class BatchLoader:
+    """
+    Collects primary key lookups of a model and loads them with a single batched query.
+
+    Lookups made with load() are resolved when the scope of the loader ends or when the first
+    result is requested. Lookups made with aload() are resolved at the next iteration of the
+    event loop, on the async executor, so every lookup awaited in the same tick shares one query. Loaded records are
+    kept by the loader, so repeated lookups of the same key do not query the database again.
+    Within an active Session, rows already in its identity map are not queried either.
+
+    Attributes:
+    - model (Model): The model instance whose table is queried.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._pending = []
+        self._loaded = {}
+        self._waiters = {}
+        self._scheduled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.dispatch()
+
+    def load(self, pk):
+        """
+        Requests the record with the given primary key.
+
+        Args:
+        - pk: The primary key of the record.
+
+        Returns:
+        - PendingRecord: The pending record, resolved on the next dispatch.
+        """
+        if pk not in self._loaded and pk not in self._pending:
+            session = Session.current()
+            loaded = session.get(self.model.__class__.__name__.lower(), pk) if session is not None else None
+            if loaded is not None:
+                self._loaded[pk] = loaded
+            else:
+                self._pending.append(pk)
+        return PendingRecord(self, pk)
+
+    def load_many(self, pks):
+        """
+        Requests the records with the given primary keys.
+
+        Args:
+        - pks (iterable): The primary keys of the records.
+
+        Returns:
+        - list: The pending records, in the same order as the keys.
+        """
+        return [self.load(pk) for pk in pks]
+
+    async def aload(self, pk):
+        """
+        Loads the record with the given primary key, batched with the other lookups of the same tick.
+
+        Args:
+        - pk: The primary key of the record.
+
+        Returns:
+        - dict: The record matching the primary key.
+
+        Raises:
+        - ValueError: If no matching record is found.
+        """
+        self.load(pk)
+        if pk in self._loaded:
+            return self._record(pk)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.setdefault(pk, []).append(waiter)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(asyncio.ensure_future, self._dispatch_waiters())
+        await waiter
+        return self._record(pk)
+
+    async def _dispatch_waiters(self):
+        # The keys and the waiters are taken together, on the event loop, so this dispatch
+        # resolves only the waiters of the keys it loads, even while another one is in flight.
+        self._scheduled = False
+        waiters, self._waiters = self._waiters, {}
+        keys, self._pending = self._pending, []
+        keys += [key for key in waiters if key not in keys and key not in self._loaded]
+        try:
+            if keys:
+                await run_sync(self._load_keys, keys)
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for futures in waiters.values():
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+
+    def dispatch(self):
+        """
+        Loads every pending lookup with one 'WHERE id IN (...)' query per chunk of keys.
+        """
+        keys, self._pending = self._pending, []
+        if not keys:
+            return
+        try:
+            self._load_keys(keys)
+        except Exception:
+            self._pending = keys + self._pending
+            raise
+
+    def _load_keys(self, keys):
+        table = self.model.__class__.__name__.lower()
+
+        def read(conn):
+            rows = []
+            for query, values in TableSQL.select_in_sql(self.model, table, 'id', keys):
+                conn.execute(query, values)
+                columns = [column[0] for column in conn.description]
+                rows.extend(dict(zip(columns, row)) for row in conn.fetchall())
+            return rows
+
+        rows = self.model._rdbms().run_read(read)
+        records = {record['id']: record for record in self.model._identity_rows(self.model._decode_rows(rows))}
+        for key in keys:
+            self._loaded[key] = records.get(key)
+
+    def _record(self, key):
+        record = self._loaded[key]
+        if record is None:
+            raise ValueError("No matching record found.")
+        return record
@@ -1,5 +1,16 @@
-from spider.fields import Field, PasswordField
-from spider.sql_utils import TableSQL
+import json
+from contextlib import contextmanager
+
+from spider.aio import run_sync
+from spider.buffer import BufferedWriter
+from spider.fields import Field, PasswordField, ForeignKey, ManyToManyField, JSONField, BinaryField, TextField
+from spider.hashers import make_passwords
+from spider.loader import BatchLoader
+from spider.related import prefetch_related_rows
+from spider.session import Session
+from spider.sql_utils import TableSQL, uses_mysql
+from spider.sqlite.blobs import DEFAULT_CHUNK_SIZE, open_blob, copy_from_blob, copy_to_blob
+from spider.sqlite.sharding import ShardedConnection, SHARD_ID_SPACE
 from spider.sqlite.sqlite_connection import SQLIteConnection
 
 
@@ -15,6 +26,15 @@ class ModelMeta(type):
         fields = {key: value for key, value in attrs.items() if isinstance(value, Field)}
         new_class = super().__new__(cls, name, bases, attrs)
         new_class._fields = fields
+        new_class._reverse_relations = {}
+
+        # Register reverse relationships on the related models
+        for field_name, field in fields.items():
+            field.name = field_name
+            field.model = new_class
+            if isinstance(field, (ForeignKey, ManyToManyField)) and isinstance(field.to, ModelMeta):
+                related_name = field.related_name or f"{name.lower()}_set"
+                field.to._reverse_relations[related_name] = (new_class, field_name, field)
         
         # Process metadata from the MetaData inner class
         meta = attrs.get('MetaData', None)
@@ -40,9 +60,16 @@ class Model(metaclass=ModelMeta):
 
         Attributes:
         - rdbms (SQLIteConnection): The database connection to be used.
+        - cache (BaseCache, optional): The result cache for get, filter and count.
+        - shard_key (str, optional): With a ShardedConnection, the field whose value picks the shard of a row.
+        - search_fields (list, optional): The text fields indexed for full-text search (SQLite FTS5).
+        - generated_columns (dict, optional): Indexed columns computed from JSONField paths, by name,
+          e.g. {'user_id': 'data__user__id'}.
         """
         rdbms = SQLIteConnection()
 
+    _prefetch_lookups = ()
+
     def get_meta_attr(self, attr, default=None):
         """
         Retrieves metadata attributes.
@@ -65,6 +92,45 @@ class Model(metaclass=ModelMeta):
         """
         return self._meta.get('rdbms')
 
+    def _route(self, kwargs):
+        """
+        Retrieves the database connection for an operation on the rows matching the given criteria.
+
+        With a ShardedConnection, criteria holding the shard key select the connection of its shard.
+
+        Args:
+        - kwargs (dict): Field names and their values the rows are filtered by.
+
+        Returns:
+        - The connection of the shard holding the rows, or the model's connection.
+        """
+        rdbms = self._rdbms()
+        shard_key = self._meta.get('shard_key')
+        if isinstance(rdbms, ShardedConnection) and shard_key in kwargs:
+            return rdbms.shard_for(kwargs[shard_key])
+        return rdbms
+
+    def _shard(self, instance):
+        """
+        Retrieves the database connection an instance is written to.
+
+        Args:
+        - instance (Model): The instance to write.
+
+        Returns:
+        - The connection of the shard the instance belongs to, or the model's connection.
+
+        Raises:
+        - ValueError: If the model is sharded and the instance has no shard key value.
+        """
+        rdbms = self._rdbms()
+        if not isinstance(rdbms, ShardedConnection):
+            return rdbms
+        shard_key = self._meta.get('shard_key')
+        if instance.__dict__.get(shard_key) is None:
+            raise ValueError(f"{self.__class__.__name__} is sharded and requires a value for {shard_key}.")
+        return rdbms.shard_for(instance.__dict__[shard_key])
+
     def __init__(self, **kwargs) -> None:
         """
         Initializes a model instance with field values.
@@ -81,6 +147,23 @@ class Model(metaclass=ModelMeta):
             else:
                 raise AttributeError(f"{key} is not a valid field for {self.__class__.__name__}")
 
+    def prefetch_related(self, *lookups):
+        """
+        Sets relations to be loaded along with the rows returned by filter and get.
+
+        Each relation is loaded with a separate batched query after the main query,
+        instead of one query per row.
+
+        Args:
+        - lookups (str): ManyToManyField names of this model, or reverse relation names
+          of ForeignKey and ManyToManyField fields pointing to this model.
+
+        Returns:
+        - Model: The model instance, to allow chaining.
+        """
+        self._prefetch_lookups = lookups
+        return self
+
     def create_table(self):
         """
         Creates the table for the model in the database.
@@ -88,33 +171,48 @@ class Model(metaclass=ModelMeta):
         Uses the SQL statements generated by TableSQL.
         """
         sql, sql_safely_password_store = TableSQL.create_table_sql(self)
-        with self._rdbms() as conn:
-            conn.execute(sql)
-            if sql_safely_password_store:
-                conn.execute(sql_safely_password_store)
-            print('Table created successfully.')
-
-    def filter(self, **kwargs):
+        rdbms = self._rdbms()
+        shards = rdbms.shards if isinstance(rdbms, ShardedConnection) else [rdbms]
+        for index, shard in enumerate(shards):
+            with shard as conn:
+                conn.execute(sql)
+                if sql_safely_password_store:
+                    conn.execute(sql_safely_password_store)
+                for m2m_sql in TableSQL.create_m2m_tables_sql(self):
+                    conn.execute(m2m_sql)
+                for index_sql in TableSQL.create_generated_indexes_sql(self):
+                    conn.execute(index_sql)
+                if index and getattr(self._fields.get('id'), 'auto_increment', False):
+                    conn.execute(*TableSQL.seed_sequence_sql(self, index * SHARD_ID_SPACE))
+                search_sql = TableSQL.create_search_sql(self)
+                if search_sql:
+                    conn.execute(*TableSQL.search_table_sql(self))
+                    if conn.fetchone() is None:
+                        for statement in search_sql:
+                            conn.execute(statement)
+        print('Table created successfully.')
+
+    def filter(self, *args, **kwargs):
         """
         Retrieves data from the table based on filter criteria.
 
         Args:
-        - kwargs (dict): Field names and their values to filter by.
+        - args (Q): Criteria combined with OR or NOT, e.g. filter(Q(name='a') | Q(name='b')).
+        - kwargs (dict): Field names and their values to filter by. Values may be expressions
+          comparing columns, e.g. filter(stock__lt=F('reserved')).
 
         Returns:
         - list: A list of dictionaries representing the filtered rows.
         """
-        query, values = TableSQL.filter_data_sql(self, kwargs)
-        with self._rdbms() as conn:
-            conn.execute(query, values)
-            data = [dict(zip([column[0] for column in conn.description], row)) for row in conn.fetchall()]
-            return data
+        query, values = TableSQL.filter_data_sql(self, kwargs, args)
+        return self._fetch_rows(query, values, self._route(kwargs))
 
-    def get(self, **kwargs):
+    def get(self, *args, **kwargs):
         """
         Retrieves a specific record from the table based on search criteria.
 
         Args:
+        - args (Q): Criteria combined with OR or NOT.
         - kwargs (dict): Field names and their values to search by.
 
         Returns:
@@ -122,12 +220,23 @@ class Model(metaclass=ModelMeta):
 
         Raises:
         - ValueError: If no matching record or multiple matching records are found.
+
+        Within an active Session, a lookup by primary key of an already loaded row
+        returns that row without querying the database. Lookups by primary key use a
+        prebuilt statement; other lookups stop reading after the second matching row.
         """
-        query, values = TableSQL.filter_data_sql(self, kwargs)
-        with self._rdbms() as conn:
-            conn.execute(query, values)
-            data = [dict(zip([column[0] for column in conn.description], row)) for row in conn.fetchall()]
-        
+        session = Session.current()
+        if session is not None and not args and list(kwargs) == ['id']:
+            loaded = session.get(self.__class__.__name__.lower(), kwargs['id'])
+            if loaded is not None and all(lookup in loaded for lookup in self._prefetch_lookups):
+                return loaded
+
+        if not args and list(kwargs) == ['id']:
+            query, values = TableSQL.select_pk_sql(self), [kwargs['id']]
+        else:
+            query, values = TableSQL.filter_data_sql(self, kwargs, args, limit=2)
+        data = self._fetch_rows(query, values, self._route(kwargs), limit=2)
+
         if len(data) == 1:
             return data[0]
         elif len(data) == 0:
@@ -135,6 +244,211 @@ class Model(metaclass=ModelMeta):
         else:
             raise ValueError("Multiple matching records found.")
 
+    def search(self, query, rank=True, limit=None, highlight=('<b>', '</b>')):
+        """
+        Searches the records whose search_fields match a full-text query.
+
+        The search runs on the model's SQLite FTS5 index, created by create_table from
+        MetaData.search_fields.
+
+        Args:
+        - query (str): The FTS5 query, e.g. 'sqlite AND "full text"' or 'data*'.
+        - rank (bool): Whether the records are ordered by relevance (bm25).
+        - limit (int, optional): The maximum number of records returned.
+        - highlight (tuple): The text inserted before and after each match in the snippet.
+
+        Returns:
+        - list: A list of dictionaries representing the matching rows, each with its 'rank'
+          (lower is more relevant) and a highlighted 'snippet'.
+
+        Raises:
+        - ValueError: If the model has no search_fields.
+        """
+        if not self._meta.get('search_fields'):
+            raise ValueError(f"{self.__class__.__name__} has no search_fields.")
+        sql, values = TableSQL.search_sql(self, query, rank, limit, highlight)
+        rows = self._fetch_rows(sql, values, identity=False)
+        if isinstance(self._rdbms(), ShardedConnection):
+            # Each shard applied the limit to its own rows.
+            if rank:
+                rows = sorted(rows, key=lambda row: row['rank'])
+            rows = rows[:limit]
+        return rows
+
+    def iterate(self, chunk_size=500, **kwargs):
+        """
+        Iterates over the records matching the filter criteria, ordered by primary key.
+
+        Records are read in pages of chunk_size rows, so the whole result set is never
+        loaded at once. On a sharded model, each page merges the pages read from every shard.
+
+        Args:
+        - chunk_size (int): The number of rows read per query.
+        - kwargs (dict): Field names and their values to filter by. If empty, all records are read.
+
+        Yields:
+        - dict: The matching records.
+        """
+        after = None
+        rdbms = self._route(kwargs)
+        while True:
+            rows = self._page(kwargs, after, chunk_size, rdbms)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = rows[-1]['id']
+
+    def _page(self, kwargs, after, chunk_size, rdbms):
+        """
+        Reads the page of records following the primary key after, ordered by primary key.
+
+        Args:
+        - kwargs (dict): Field names and their values to filter by.
+        - after: The last primary key of the previous page, or None for the first page.
+        - chunk_size (int): The maximum number of rows in the page.
+        - rdbms: The connection read, as returned by _route().
+
+        Returns:
+        - list: The records of the page.
+        """
+        query, values = TableSQL.select_page_sql(self, kwargs, after, chunk_size)
+        rows = self._fetch_rows(query, values, rdbms)
+        if isinstance(rdbms, ShardedConnection):
+            # One ordered page per shard: sorting merges the runs.
+            rows = sorted(rows, key=lambda row: row['id'])[:chunk_size]
+        return rows
+
+    def count(self, *args, **kwargs):
+        """
+        Counts the records in the table matching the filter criteria.
+
+        Args:
+        - args (Q): Criteria combined with OR or NOT.
+        - kwargs (dict): Field names and their values to filter by. If empty, all records are counted.
+
+        Returns:
+        - int: The number of matching records.
+        """
+        query, values = TableSQL.count_data_sql(self, kwargs, args)
+        cache = self._meta.get('cache')
+        key = (query, tuple(values))
+        tables = [self.__class__.__name__.lower()]
+        if cache is not None:
+            total = cache.get(key)
+            if total is not None:
+                return total
+            version = cache.version(tables)
+        def read(conn):
+            conn.execute(query, values)
+            return conn.fetchone()[0]
+
+        total = self._route(kwargs).run_read(read)
+        if cache is not None:
+            cache.set(key, total, tables, version)
+        return total
+
+    def _fetch_rows(self, query, values, rdbms=None, limit=None, identity=True):
+        """
+        Runs a SELECT statement and returns its rows, going through the result cache if configured.
+
+        Rows are merged into the active Session and have the relations set by prefetch_related
+        attached. Queries with prefetched relations bypass the cache.
+
+        Args:
+        - query (str): The SELECT SQL statement.
+        - values (list): The values bound to the statement.
+        - rdbms (optional): The connection to read from, by default the model's connection.
+        - limit (int, optional): The maximum number of rows fetched from the cursor.
+        - identity (bool): Whether the rows are merged into the active Session. Rows holding
+          computed columns (e.g. search ranks) are not, so those columns stay out of the shared rows.
+
+        Returns:
+        - list: A list of dictionaries representing the rows.
+        """
+        merge = self._identity_rows if identity else (lambda rows: rows)
+        cache = self._meta.get('cache') if not self._prefetch_lookups else None
+        key = (query, tuple(values))
+        tables = [self.__class__.__name__.lower()]
+        if cache is not None:
+            data = cache.get(key)
+            if data is not None:
+                return merge(self._decode_rows([dict(row) for row in data]))
+            version = cache.version(tables)
+
+        def read(conn):
+            conn.execute(query, values)
+            rows = conn.fetchall() if limit is None else conn.fetchmany(limit)
+            data = [dict(zip([column[0] for column in conn.description], row)) for row in rows]
+            return prefetch_related_rows(self, conn, data, self._prefetch_lookups)
+
+        data = (rdbms or self._rdbms()).run_read(read)
+        if cache is not None:
+            cache.set(key, [dict(row) for row in data], tables, version)
+        return merge(self._decode_rows(data))
+
+    def _decode_rows(self, rows):
+        """
+        Deserializes the JSONField values and decompresses the compressed TextField values of rows, in place.
+
+        Args:
+        - rows (list): The rows, as dictionaries, returned by a query.
+
+        Returns:
+        - list: The same rows.
+        """
+        json_fields = [name for name, field in self._fields.items() if isinstance(field, JSONField)]
+        text_fields = [(name, field) for name, field in self._fields.items() if isinstance(field, TextField) and field.compress]
+        if not json_fields and not text_fields:
+            return rows
+        for row in rows:
+            for name in json_fields:
+                if isinstance(row.get(name), str):
+                    row[name] = json.loads(row[name])
+            for name, field in text_fields:
+                if isinstance(row.get(name), (bytes, bytearray)):
+                    row[name] = field.decode(row[name])
+        return rows
+
+    def _invalidate(self, *tables):
+        """
+        Drops the cached results read from the given tables after a write.
+
+        Args:
+        - tables (str): The names of the tables that were written to.
+        """
+        cache = self._meta.get('cache')
+        if cache is not None:
+            for table in tables:
+                cache.invalidate(table)
+
+    def _identity_rows(self, rows):
+        """
+        Replaces rows by the ones already loaded in the active Session, if any.
+
+        Args:
+        - rows (list): The rows, as dictionaries, returned by a query.
+
+        Returns:
+        - list: The rows, sharing one dictionary per primary key within the session.
+        """
+        session = Session.current()
+        if session is None:
+            return rows
+        table = self.__class__.__name__.lower()
+        return [session.add(table, row) for row in rows]
+
+    def batch(self):
+        """
+        Creates a loader that coalesces primary key lookups into batched queries.
+
+        Use it as a context manager with load(), or await aload() from coroutines
+        running in the same event loop tick.
+
+        Returns:
+        - BatchLoader: The loader for this model.
+        """
+        return BatchLoader(self)
+
     def all(self):
         """
         Retrieves all records from the table.
@@ -143,46 +457,341 @@ class Model(metaclass=ModelMeta):
         - list: A list of tuples representing all rows in the table.
         """
         query = TableSQL.select_all_sql(self)
-        with self._rdbms() as conn:
+
+        def read(conn):
             conn.execute(query)
-            data = conn.fetchall()
-        return data
+            return conn.fetchall()
+
+        return self._rdbms().run_read(read)
 
     def save(self):
         """
         Saves the current instance to the database.
 
         Inserts the record into the table and handles password hashing if applicable.
+        The password is hashed on the hashing executor before the connection is opened,
+        so no connection or transaction is held while hashing.
+        The primary key of the new record is set on the instance's 'id' attribute.
         """
         normal_insert, has_password = TableSQL.insert_data_sql(self)
         query, values = normal_insert
-        pk = None
-        with self._rdbms() as conn:
+        field_name, field = self._password_field()
+        password = make_passwords(field, [getattr(self, field_name)])[0] if has_password else None
+
+        def write(conn):
             conn.execute(query, values)
-            conn.execute(f'SELECT * FROM {self.__class__.__name__.lower()};')
-            pk = conn.fetchall()[-1][0]
+            pk = conn.lastrowid
             if has_password:
-                password = None
-                conn.execute(f'UPDATE {self.__class__.__name__.lower()} SET passwordID = {pk} WHERE id = {pk};')
-                for field_name, field_class in self._fields.items():
-                    if isinstance(field_class, PasswordField):
-                        password = getattr(self, field_name)
-                        salt = field_class.salt
-                        hash_name = field_class.hash
-                        _iter = field_class.iterations
-
-                from hashlib import pbkdf2_hmac
-
-                salt = salt[0]
-                _hash = pbkdf2_hmac(
-                    hash_name=hash_name,
-                    password=password.encode(),
-                    salt=salt.to_bytes(),
-                    iterations=_iter
-                ).hex()
-                query = f"INSERT INTO passwords (id, hash, salt) VALUES ({pk}, '{_hash}', '{salt}');"
-                conn.execute(query)
-            print("Data recorded successfully.")
+                update_query, password_query = TableSQL.insert_password_sql(self, field_name)
+                conn.execute(update_query, [pk, pk])
+                conn.execute(password_query, [pk, *password])
+            return pk
+
+        pk = self._shard(self).run_write(write)
+        if 'id' in self._fields:
+            self.id = pk
+        print("Data recorded successfully.")
+        self._invalidate(self.__class__.__name__.lower(), 'passwords')
+
+    def bulk_create(self, instances):
+        """
+        Saves many instances of the model in a single transaction.
+
+        Passwords are hashed in parallel on the hashing executor before the connection is opened.
+        Models without a PasswordField are inserted with a single executemany call; otherwise rows
+        are inserted one by one to link each of them to its hash, and their primary keys are set
+        on the instances' 'id' attribute. On a sharded model, each shard writes its own instances,
+        in parallel.
+
+        Args:
+        - instances (list): The model instances to save.
+        """
+        if not instances:
+            return
+        field_name, field = self._password_field()
+        passwords = make_passwords(field, [getattr(instance, field_name) for instance in instances]) if field else None
+
+        def writer(instances, passwords):
+            inserts = [TableSQL.insert_data_sql(instance)[0] for instance in instances]
+
+            def write(conn):
+                if passwords is None and len({query for query, _ in inserts}) == 1:
+                    conn.executemany(inserts[0][0], [values for _, values in inserts])
+                    return []
+                pks = []
+                for query, values in inserts:
+                    conn.execute(query, values)
+                    pks.append(conn.lastrowid)
+                if passwords is not None:
+                    update_query, password_query = TableSQL.insert_password_sql(self, field_name)
+                    conn.executemany(update_query, [[pk, pk] for pk in pks])
+                    conn.executemany(password_query, [[pk, *password] for pk, password in zip(pks, passwords)])
+                return pks
+
+            return write
+
+        rdbms = self._rdbms()
+        if isinstance(rdbms, ShardedConnection):
+            groups = {}
+            for position, instance in enumerate(instances):
+                index = rdbms.shards.index(self._shard(instance))
+                groups.setdefault(index, []).append(position)
+            results = rdbms.fan_out('run_write', {
+                index: writer([instances[i] for i in positions], passwords and [passwords[i] for i in positions])
+                for index, positions in groups.items()
+            })
+            written = [(instances[i], pk) for index, positions in groups.items() for i, pk in zip(positions, results[index])]
+        else:
+            written = zip(instances, rdbms.run_write(writer(instances, passwords)))
+        for instance, pk in written:
+            if 'id' in instance._fields:
+                instance.id = pk
+        print("Data recorded successfully.")
+        self._invalidate(self.__class__.__name__.lower(), 'passwords')
+
+    def upsert(self, instance, conflict_fields, update_fields=None):
+        """
+        Inserts an instance, or updates the existing record it conflicts with, in a single statement.
+
+        Args:
+        - instance (Model): The instance to write.
+        - conflict_fields (list): The fields identifying an existing record. On SQLite they must be
+          covered by a unique index; MySQL uses any unique key.
+        - update_fields (list, optional): The fields overwritten on conflict. Defaults to every field
+          other than the conflict fields; if empty, an existing record is left as is.
+        """
+        self.bulk_upsert([instance], conflict_fields, update_fields)
+
+    def bulk_upsert(self, instances, conflict_fields, update_fields=None):
+        """
+        Inserts many instances, or updates the existing records they conflict with, in a single transaction.
+
+        The primary keys of the written records are not set on the instances, since an update does
+        not report one.
+
+        Args:
+        - instances (list): The instances to write.
+        - conflict_fields (list): The fields identifying an existing record.
+        - update_fields (list, optional): The fields overwritten on conflict, as in upsert.
+
+        Raises:
+        - ValueError: If the model has a PasswordField, whose hash cannot be linked to an updated record.
+        """
+        if not instances:
+            return
+        if self._password_field()[0] is not None:
+            raise ValueError(f"{self.__class__.__name__} has a PasswordField and cannot be upserted.")
+
+        groups = {}
+        for instance in instances:
+            statement = TableSQL.upsert_data_sql(instance, conflict_fields, update_fields)
+            groups.setdefault(self._shard(instance), []).append(statement)
+
+        def writer(statements):
+            def write(conn):
+                if len({query for query, _ in statements}) == 1:
+                    conn.executemany(statements[0][0], [values for _, values in statements])
+                else:
+                    for query, values in statements:
+                        conn.execute(query, values)
+            return write
+
+        for rdbms, statements in groups.items():
+            rdbms.run_write(writer(statements))
+        print("Data recorded successfully.")
+        self._invalidate(self.__class__.__name__.lower())
+        session = Session.current()
+        if session is not None:
+            session.expire(self.__class__.__name__.lower())
+
+    def buffered(self, max_size=10000, batch_size=500, flush_interval=1.0, on_error=None):
+        """
+        Creates a write-behind writer inserting instances of the model in bulk from a background thread.
+
+        Args:
+        - max_size (int): The maximum number of queued instances before add() blocks.
+        - batch_size (int): The maximum number of instances written per bulk insert.
+        - flush_interval (float): The maximum time, in seconds, an instance waits in the buffer.
+        - on_error (callable, optional): Called with the exception and the batch when a bulk insert fails.
+
+        Returns:
+        - BufferedWriter: The writer. Close it, or use it as a context manager, to write the pending instances.
+        """
+        return BufferedWriter(self, max_size, batch_size, flush_interval, on_error)
+
+    def _password_field(self):
+        """
+        Retrieves the PasswordField of the model, if any.
+
+        Returns:
+        - tuple: A tuple containing the field name and the field, or (None, None).
+        """
+        for field_name, field_class in self._fields.items():
+            if isinstance(field_class, PasswordField):
+                return field_name, field_class
+        return None, None
+
+    def _blob_field(self, field_name):
+        """
+        Checks that a field can be streamed as a BLOB.
+
+        Args:
+        - field_name (str): The field name.
+
+        Raises:
+        - ValueError: If the field is not a BinaryField, or the model is not stored in a single SQLite database.
+        """
+        if not isinstance(self._fields.get(field_name), BinaryField):
+            raise ValueError(f"{field_name} is not a BinaryField of {self.__class__.__name__}.")
+        rdbms = self._rdbms()
+        if uses_mysql(rdbms) or isinstance(rdbms, ShardedConnection):
+            raise ValueError("Streaming BLOBs is only supported on a single SQLite database.")
+
+    @contextmanager
+    def open_blob(self, field_name, pk, readonly=True):
+        """
+        Opens the BinaryField value of a record for incremental, seekable access.
+
+        The value's size cannot change through the handle, and each write is applied on its own;
+        use write_blob to store a whole new value in one transaction.
+
+        Args:
+        - field_name (str): The BinaryField name.
+        - pk (int): The primary key of the record.
+        - readonly (bool): Whether the value is opened for reading only.
+
+        Yields:
+        - sqlite3.Blob: A file-like handle supporting read, write, seek, tell, len() and slicing.
+
+        Example:
+            >>> with Media().open_blob('content', 1) as blob:
+            ...     header = blob.read(16)
+        """
+        self._blob_field(field_name)
+        with self._rdbms() as cursor:
+            blob = open_blob(cursor, self.__class__.__name__.lower(), field_name, pk, readonly)
+            try:
+                yield blob
+            finally:
+                blob.close()
+        if not readonly:
+            self._invalidate(self.__class__.__name__.lower())
+
+    def read_blob(self, field_name, pk, out, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Streams the BinaryField value of a record into a file object or a buffer, one chunk at a time.
+
+        Args:
+        - field_name (str): The BinaryField name.
+        - pk (int): The primary key of the record.
+        - out: A file object with a write() method, or a writable buffer (bytearray, memoryview)
+          at least as large as the value.
+        - chunk_size (int): The number of bytes read at a time.
+
+        Returns:
+        - int: The number of bytes read.
+        """
+        self._blob_field(field_name)
+
+        def read(conn):
+            with open_blob(conn, self.__class__.__name__.lower(), field_name, pk) as blob:
+                return copy_from_blob(blob, out, chunk_size)
+
+        return self._rdbms().run_read(read)
+
+    def write_blob(self, field_name, pk, source, size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Streams a file object or a buffer into the BinaryField value of a record, one chunk at a time.
+
+        The value is first replaced by zeros of the given size, then written in place, in a
+        single transaction.
+
+        Args:
+        - field_name (str): The BinaryField name.
+        - pk (int): The primary key of the record.
+        - source: A file object with a read() method, or a buffer (bytes, bytearray, memoryview).
+        - size (int, optional): The size of the value, in bytes. Required for file objects.
+        - chunk_size (int): The number of bytes written at a time.
+
+        Raises:
+        - ValueError: If size is missing for a file object, or the source does not hold size bytes.
+        """
+        self._blob_field(field_name)
+        if size is None:
+            if hasattr(source, 'read'):
+                raise ValueError("The size of a file object must be given.")
+            size = memoryview(source).nbytes
+        query, values = TableSQL.allocate_blob_sql(self, field_name, pk, size)
+
+        def write(conn):
+            conn.execute(query, values)
+            with open_blob(conn, self.__class__.__name__.lower(), field_name, pk, readonly=False) as blob:
+                written = copy_to_blob(blob, source, chunk_size)
+            if written != size:
+                raise ValueError(f"Expected {size} bytes, got {written}.")
+
+        self._rdbms().run_write(write)
+        self._invalidate(self.__class__.__name__.lower())
+
+    def compact(self, batch_size=500, vacuum=False):
+        """
+        Compresses the stored values of the compressed TextFields that are still stored as text.
+
+        Rows are read and rewritten in batches of batch_size, by primary key, so the table is never
+        loaded at once. Use it once after enabling compress on a field of an existing table.
+        Uncompressed values are recognized by their missing prefix, whether they are read as text
+        or as bytes. On MySQL, create_table() does not change an existing column, so the column
+        must first be converted with 'ALTER TABLE <table> MODIFY <column> LONGBLOB;'.
+
+        Args:
+        - batch_size (int): The number of rows read and rewritten per transaction.
+        - vacuum (bool): Whether the freed space is reclaimed afterwards (VACUUM on SQLite,
+          OPTIMIZE TABLE on MySQL).
+
+        Returns:
+        - int: The number of records rewritten.
+        """
+        text_fields = {name: field for name, field in self._fields.items() if isinstance(field, TextField) and field.compress}
+        if not text_fields:
+            return 0
+        rdbms = self._rdbms()
+        connections = rdbms.shards if isinstance(rdbms, ShardedConnection) else [rdbms]
+
+        def read(conn):
+            conn.execute(query, values)
+            columns = [column[0] for column in conn.description]
+            return [dict(zip(columns, row)) for row in conn.fetchall()]
+
+        compacted = 0
+        for connection in connections:
+            after = None
+            while True:
+                query, values = TableSQL.select_page_sql(self, {}, after, batch_size)
+                rows = connection.run_read(read)
+                updates = {}
+                for row in rows:
+                    changes = {
+                        name: field.encode(field.decode(row[name])) for name, field in text_fields.items()
+                        if row[name] is not None and not field.is_compressed(row[name])
+                    }
+                    changes = {name: value for name, value in changes.items() if isinstance(value, bytes)}
+                    if changes:
+                        updates.setdefault(tuple(changes), []).append([*changes.values(), row['id']])
+                if updates:
+                    connection.run_write(lambda conn: [
+                        conn.executemany(TableSQL.update_columns_sql(self, columns), params)
+                        for columns, params in updates.items()
+                    ])
+                    compacted += sum(len(params) for params in updates.values())
+                if len(rows) < batch_size:
+                    break
+                after = rows[-1]['id']
+            if vacuum:
+                with connection as conn:
+                    conn.execute(TableSQL.vacuum_sql(self))
+        self._invalidate(self.__class__.__name__.lower())
+        print('Data compacted successfully.')
+        return compacted
 
     def delete(self, id):
         """
@@ -192,18 +801,130 @@ class Model(metaclass=ModelMeta):
         - id (int): The primary key of the record to delete.
         """
         query, param = TableSQL.delete_data_sql(self, id)
-        with self._rdbms() as conn:
-            conn.execute(query, param)
-            print('Data deleted successfully')
+        self._rdbms().run_write(lambda conn: conn.execute(query, param))
+        print('Data deleted successfully')
+        self._invalidate(self.__class__.__name__.lower())
+        session = Session.current()
+        if session is not None:
+            session.remove(self.__class__.__name__.lower(), id)
 
     def update(self, **kwargs):
         """
         Updates records in the table based on provided field values.
 
+        The first keyword argument is the field to set, the others select the records. The new
+        value may be an expression computed by the database, e.g. update(views=F('views') + 1, id=1).
+
         Args:
         - kwargs (dict): Field names and their new values.
+
+        Raises:
+        - ValueError: If the model is sharded and the field to set is the shard key, since the rows
+          would stay in the shard of their old value.
         """
+        if kwargs and isinstance(self._rdbms(), ShardedConnection) and next(iter(kwargs)) == self._meta.get('shard_key'):
+            raise ValueError(f"{self._meta['shard_key']} is the shard key of {self.__class__.__name__} and cannot be updated.")
+        rdbms = self._route(dict(list(kwargs.items())[1:]))
         query, values = TableSQL().update_data_sql(self, kwargs)
-        with self._rdbms() as conn:
-            conn.execute(query, values)
-            print('Data altered successfully.')
+        rdbms.run_write(lambda conn: conn.execute(query, values))
+        print('Data altered successfully.')
+        self._invalidate(self.__class__.__name__.lower())
+        session = Session.current()
+        if session is not None:
+            session.expire(self.__class__.__name__.lower())
+
+    async def afilter(self, *args, **kwargs):
+        """
+        Awaitable counterpart of filter, run on the async executor.
+        """
+        return await run_sync(self.filter, *args, **kwargs)
+
+    async def aget(self, *args, **kwargs):
+        """
+        Awaitable counterpart of get, run on the async executor.
+        """
+        return await run_sync(self.get, *args, **kwargs)
+
+    async def acount(self, *args, **kwargs):
+        """
+        Awaitable counterpart of count, run on the async executor.
+        """
+        return await run_sync(self.count, *args, **kwargs)
+
+    async def asearch(self, query, rank=True, limit=None, highlight=('<b>', '</b>')):
+        """
+        Awaitable counterpart of search, run on the async executor.
+        """
+        return await run_sync(self.search, query, rank, limit, highlight)
+
+    async def aall(self):
+        """
+        Awaitable counterpart of all, run on the async executor.
+        """
+        return await run_sync(self.all)
+
+    async def asave(self):
+        """
+        Awaitable counterpart of save, run on the async executor.
+        """
+        return await run_sync(self.save)
+
+    async def abulk_create(self, instances):
+        """
+        Awaitable counterpart of bulk_create, run on the async executor.
+        """
+        return await run_sync(self.bulk_create, instances)
+
+    async def aupsert(self, instance, conflict_fields, update_fields=None):
+        """
+        Awaitable counterpart of upsert, run on the async executor.
+        """
+        return await run_sync(self.upsert, instance, conflict_fields, update_fields)
+
+    async def abulk_upsert(self, instances, conflict_fields, update_fields=None):
+        """
+        Awaitable counterpart of bulk_upsert, run on the async executor.
+        """
+        return await run_sync(self.bulk_upsert, instances, conflict_fields, update_fields)
+
+    async def adelete(self, id):
+        """
+        Awaitable counterpart of delete, run on the async executor.
+        """
+        return await run_sync(self.delete, id)
+
+    async def aupdate(self, **kwargs):
+        """
+        Awaitable counterpart of update, run on the async executor.
+        """
+        return await run_sync(self.update, **kwargs)
+
+    async def aiterate(self, chunk_size=500, **kwargs):
+        """
+        Asynchronously iterates over the records matching the filter criteria, ordered by primary key.
+
+        Each page of chunk_size rows is read on the async executor; no connection is held
+        between pages. On a sharded model, each page merges the pages read from every shard.
+
+        Args:
+        - chunk_size (int): The number of rows read per query.
+        - kwargs (dict): Field names and their values to filter by. If empty, all records are read.
+
+        Yields:
+        - dict: The matching records.
+        """
+        after = None
+        rdbms = self._route(kwargs)
+        while True:
+            rows = await run_sync(self._page, kwargs, after, chunk_size, rdbms)
+            for row in rows:
+                yield row
+            if len(rows) < chunk_size:
+                return
+            after = rows[-1]['id']
+
+    def __aiter__(self):
+        """
+        Asynchronously iterates over all records of the table, as in 'async for row in Model()'.
+        """
+        return self.aiterate()
@@ -1,3 +1,5 @@
+from contextvars import ContextVar
+
 from MySQLdb import connect, OperationalError
 
 __all__ = ['MysqlConnection']
@@ -8,8 +10,11 @@ class MysqlConnection:
 
     This class handles the connection to a MySQL database, including creating the database if it does not exist.
 
+    A connection is opened for each 'with' block and kept per thread and per asyncio task (in a context variable),
+    so a single instance, such as the one shared by a model's MetaData, can be used concurrently.
+
     Attributes:
-        conn (MySQLdb.connections.Connection): The MySQL database connection object.
+        conn (MySQLdb.connections.Connection): The MySQL database connection object of the current context.
     """
 
     def __init__(self, *args, **kwargs) -> None:
@@ -27,28 +32,35 @@ class MysqlConnection:
                 - password (str): The password to authenticate with.
                 - database/db (str): The name of the database to connect to.
         """
-        self.conn = None
+        self._args = args
+        self._kwargs = kwargs
+        self._state = ContextVar(f'mysql_connection_{id(self)}', default=None)
         try:
-            self.conn = connect(*args, **kwargs)
+            connect(*args, **kwargs).close()
         except OperationalError as e:
             database = kwargs.get('database') or kwargs.get('db')
             _conn = connect(host=kwargs.get('host'), user=kwargs.get('user'), password=kwargs.get('password'))
             _conn.cursor().execute(f'CREATE DATABASE IF NOT EXISTS {database};')
             _conn.commit()
             _conn.close()
-        finally:
-            self.conn = connect(*args, **kwargs)
+
+    @property
+    def conn(self):
+        state = self._state.get()
+        return state[0] if state else None
 
     def __enter__(self):
         """
         Enter the runtime context related to this object.
 
-        Returns a MySQL cursor object that can be used to execute queries.
+        Opens a connection for the current context and returns a MySQL cursor object that can be used to execute queries.
 
         Returns:
             MySQLdb.cursors.Cursor: A cursor object to interact with the MySQL database.
         """
-        return self.conn.cursor()
+        conn = connect(*self._args, **self._kwargs)
+        self._state.set((conn, self._state.get()))
+        return conn.cursor()
 
     def __exit__(self, exc_type, exc_value, exc_tb):
         """
@@ -61,5 +73,39 @@ class MysqlConnection:
             exc_value (Exception): The exception instance.
             exc_tb (traceback): The traceback object.
         """
-        self.conn.commit()
-        self.conn.close()
+        conn, previous = self._state.get()
+        self._state.set(previous)
+        try:
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run_write(self, func):
+        """
+        Run a write in its own 'with' block and commit it, or roll it back if the function raises.
+
+        Parameters:
+            func (callable): A function receiving a cursor and performing the write.
+
+        Returns:
+            The value returned by the function.
+        """
+        with self as cursor:
+            try:
+                return func(cursor)
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    def run_read(self, func):
+        """
+        Run a read in its own 'with' block.
+
+        Parameters:
+            func (callable): A function receiving a cursor and performing the reads.
+
+        Returns:
+            The value returned by the function.
+        """
+        with self as cursor:
+            return func(cursor)
@@ -0,0 +1,230 @@
+"""
+This module handles the loading of related rows between models.
+
+Classes:
+- ManyToManyManager: Reads and writes the links of a ManyToManyField for one model instance.
+
+Functions:
+- relation_queries(model, lookup, keys): Generates the batched queries needed to load a relation.
+- prefetch_related_rows(model, cursor, rows, lookups): Loads related rows and attaches them to each row.
+"""
+
+from spider.fields import ForeignKey, ManyToManyField
+from spider.sql_utils import TableSQL
+
+
+def relation_queries(model, lookup, keys):
+    """
+    Generate the batched queries needed to load a relation for the given primary keys.
+
+    Supported lookups are ManyToManyField names declared on the model, and reverse names of
+    ForeignKey and ManyToManyField fields declared on other models pointing to this one.
+
+    Args:
+    - model (Model): The model instance the rows belong to.
+    - lookup (str): The name of the relation to load.
+    - keys (list): The primary keys of the rows to load the relation for.
+
+    Returns:
+    - tuple: A tuple containing a list of (query, values) pairs and the name of the column
+      holding the key of the owning row in each result.
+
+    Raises:
+    - AttributeError: If the lookup is not a valid relation for the model.
+    """
+    table = model.__class__.__name__.lower()
+    field = model._fields.get(lookup)
+
+    if isinstance(field, ManyToManyField):
+        target = field.to.__name__.lower()
+        through, source_column, target_column = TableSQL.m2m_table(table, lookup, target)
+        queries = TableSQL.select_through_in_sql(model, target, through, source_column, target_column, keys)
+        return queries, '_prefetch_key'
+
+    if lookup in model._reverse_relations:
+        related_model, field_name, field = model._reverse_relations[lookup]
+        related_table = related_model.__name__.lower()
+        if isinstance(field, ManyToManyField):
+            through, source_column, target_column = TableSQL.m2m_table(related_table, field_name, table)
+            queries = TableSQL.select_through_in_sql(model, related_table, through, target_column, source_column, keys)
+            return queries, '_prefetch_key'
+        if isinstance(field, ForeignKey):
+            return TableSQL.select_in_sql(model, related_table, field_name, keys), field_name
+
+    raise AttributeError(f"{lookup} is not a valid relation for {model.__class__.__name__}.")
+
+
+def _related_model(model, lookup):
+    """
+    Return an instance of the model whose rows a relation loads.
+
+    Args:
+    - model (Model): The model instance the relation belongs to.
+    - lookup (str): The name of the relation.
+
+    Returns:
+    - Model: An instance of the related model.
+    """
+    field = model._fields.get(lookup)
+    if isinstance(field, ManyToManyField):
+        return field.to()
+    return model._reverse_relations[lookup][0]()
+
+
+def prefetch_related_rows(model, cursor, rows, lookups):
+    """
+    Load related rows for each lookup and attach them to the given rows.
+
+    Each relation is loaded with one 'WHERE ... IN (...)' query per chunk of primary keys,
+    so the number of queries does not depend on the number of rows. The related rows are
+    stored as a list of dictionaries under the lookup name of each row, with their values
+    decoded as the related model decodes its own rows.
+
+    Args:
+    - model (Model): The model instance the rows belong to.
+    - cursor: The database cursor used to run the queries.
+    - rows (list): The rows, as dictionaries, to attach the related rows to.
+    - lookups (iterable): The names of the relations to load.
+
+    Returns:
+    - list: The same rows with the related rows attached.
+    """
+    rows_by_key = {}
+    for row in rows:
+        rows_by_key.setdefault(row.get('id'), []).append(row)
+    keys = [key for key in rows_by_key if key is not None]
+
+    for lookup in lookups:
+        for row in rows:
+            row[lookup] = []
+        if not keys:
+            continue
+
+        queries, key_column = relation_queries(model, lookup, keys)
+        related_model = _related_model(model, lookup)
+        for query, values in queries:
+            cursor.execute(query, values)
+            columns = [column[0] for column in cursor.description]
+            for related in related_model._decode_rows([dict(zip(columns, record)) for record in cursor.fetchall()]):
+                key = related.pop('_prefetch_key') if key_column == '_prefetch_key' else related[key_column]
+                for row in rows_by_key.get(key, []):
+                    row[lookup].append(related)
+    return rows
+
+
+def _pk(obj):
+    """
+    Return the primary key of a model instance, a row dictionary or a raw primary key.
+
+    Args:
+    - obj: The object to get the primary key from.
+
+    Returns:
+    - int: The primary key.
+
+    Raises:
+    - ValueError: If the object has no primary key.
+    """
+    if isinstance(obj, dict):
+        pk = obj.get('id')
+    elif hasattr(obj, '_fields'):
+        pk = obj.__dict__.get('id')
+    else:
+        pk = obj
+    if pk is None:
+        raise ValueError(f"{obj!r} has no primary key. Save it before linking it.")
+    return pk
+
+
+class ManyToManyManager:
+    """
+    Manages the links of a ManyToManyField for one model instance.
+
+    Every write is issued as bulk statements on a single connection, regardless of the
+    number of objects passed.
+
+    Attributes:
+    - instance (Model): The model instance owning the links.
+    - field (ManyToManyField): The field describing the relationship.
+    """
+
+    def __init__(self, instance, field):
+        self.instance = instance
+        self.field = field
+        table = instance.__class__.__name__.lower()
+        self.target = field.to.__name__.lower()
+        self.through, self.source_column, self.target_column = TableSQL.m2m_table(table, field.name, self.target)
+
+    def _run(self, queries):
+        def write(conn):
+            for query, values in queries:
+                conn.execute(query, values)
+
+        self.instance._rdbms().run_write(write)
+        self.instance._invalidate(self.through)
+
+    def all(self):
+        """
+        Retrieves the rows linked to the instance.
+
+        Returns:
+        - list: A list of dictionaries representing the linked rows.
+        """
+        queries = TableSQL.select_through_in_sql(
+            self.instance, self.target, self.through, self.source_column, self.target_column, [_pk(self.instance)]
+        )
+
+        def read(conn):
+            data = []
+            for query, values in queries:
+                conn.execute(query, values)
+                columns = [column[0] for column in conn.description]
+                for row in conn.fetchall():
+                    related = dict(zip(columns, row))
+                    related.pop('_prefetch_key')
+                    data.append(related)
+            return data
+
+        return self.field.to()._decode_rows(self.instance._rdbms().run_read(read))
+
+    def add(self, *objs):
+        """
+        Links the given objects to the instance. Existing links are kept.
+
+        Args:
+        - objs: Model instances, row dictionaries or primary keys of the target model.
+        """
+        target_ids = list(dict.fromkeys(_pk(obj) for obj in objs))
+        self._run(TableSQL.m2m_add_sql(
+            self.instance, self.through, self.source_column, self.target_column, _pk(self.instance), target_ids
+        ))
+        print('Relations added successfully.')
+
+    def remove(self, *objs):
+        """
+        Unlinks the given objects from the instance.
+
+        Args:
+        - objs: Model instances, row dictionaries or primary keys of the target model.
+        """
+        target_ids = list(dict.fromkeys(_pk(obj) for obj in objs))
+        self._run(TableSQL.m2m_remove_sql(
+            self.instance, self.through, self.source_column, self.target_column, _pk(self.instance), target_ids
+        ))
+        print('Relations removed successfully.')
+
+    def set(self, objs):
+        """
+        Replaces the links of the instance with the given objects, in a single transaction.
+
+        Args:
+        - objs (iterable): Model instances, row dictionaries or primary keys of the target model.
+        """
+        source_id = _pk(self.instance)
+        target_ids = list(dict.fromkeys(_pk(obj) for obj in objs))
+        queries = TableSQL.m2m_remove_sql(self.instance, self.through, self.source_column, self.target_column, source_id)
+        queries += TableSQL.m2m_add_sql(
+            self.instance, self.through, self.source_column, self.target_column, source_id, target_ids
+        )
+        self._run(queries)
+        print('Relations set successfully.')
@@ -0,0 +1,140 @@
+"""
+This module handles read/write splitting between a primary database and its replicas.
+
+Classes:
+- ReplicaRouter: Sends reads to replicas and writes and transactions to the primary.
+"""
+
+import itertools
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+
+from spider.session import Session
+
+STRATEGIES = ('round_robin', 'least_connections')
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a pool of replicas and writes and transactions to the primary.
+
+    The router is used in place of a connection in a model's MetaData. Reads made through
+    run_read (get, filter, all, count, ...) go to a replica, picked in turn ('round_robin')
+    or with the fewest reads in flight ('least_connections'). Writes made through run_write
+    (save, bulk_create, update, delete, ...) and everything inside a 'with' block go to the
+    primary.
+
+    Replicas may lag behind the primary. With sticky enabled, reads following a write are
+    sent to the primary too: for the rest of the active Session if there is one, otherwise
+    for sticky_seconds in the current thread or asyncio task.
+
+    Attributes:
+    - primary: The connection to the primary database.
+    - replicas (list): The connections to the replicas.
+    - strategy (str): How a replica is picked, 'round_robin' or 'least_connections'.
+    - sticky (bool): Whether reads following a write are sent to the primary.
+    - sticky_seconds (float): How long reads are sent to the primary after a write, outside a Session.
+
+    Example:
+        >>> class MetaData:
+        ...     rdbms = ReplicaRouter(MysqlConnection(host='primary', ...),
+        ...                           [MysqlConnection(host='replica1', ...)], sticky=True)
+    """
+
+    def __init__(self, primary, replicas, strategy='round_robin', sticky=False, sticky_seconds=1.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}. Choose one of {list(STRATEGIES)}.")
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.sticky = sticky
+        self.sticky_seconds = sticky_seconds
+        self._turn = itertools.count()
+        self._in_flight = [0] * len(self.replicas)
+        self._lock = threading.Lock()
+        self._sticky_sessions = weakref.WeakSet()
+        self._transactions = ContextVar(f'replica_router_transactions_{id(self)}', default=0)
+        self._written_at = ContextVar(f'replica_router_written_at_{id(self)}', default=None)
+
+    def __enter__(self):
+        self._transactions.set(self._transactions.get() + 1)
+        try:
+            return self.primary.__enter__()
+        except BaseException:
+            self._transactions.set(self._transactions.get() - 1)
+            raise
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            return self.primary.__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._transactions.set(self._transactions.get() - 1)
+
+    def run_write(self, func):
+        """
+        Runs a write on the primary.
+
+        Args:
+        - func (callable): A function receiving a cursor and performing the write.
+
+        Returns:
+        - The value returned by the function.
+        """
+        try:
+            return self.primary.run_write(func)
+        finally:
+            if self.sticky:
+                session = Session.current()
+                if session is not None:
+                    self._sticky_sessions.add(session)
+                else:
+                    self._written_at.set(time.monotonic())
+
+    def run_read(self, func):
+        """
+        Runs a read on a replica, or on the primary inside a transaction or after a sticky write.
+
+        Args:
+        - func (callable): A function receiving a cursor and performing the reads.
+
+        Returns:
+        - The value returned by the function.
+        """
+        if not self.replicas or self._reads_from_primary():
+            return self.primary.run_read(func)
+        index = self._acquire()
+        try:
+            return self.replicas[index].run_read(func)
+        finally:
+            with self._lock:
+                self._in_flight[index] -= 1
+
+    def close(self):
+        """
+        Closes the primary and the replicas that can be closed.
+        """
+        for connection in [self.primary, *self.replicas]:
+            if hasattr(connection, 'close'):
+                connection.close()
+
+    def _reads_from_primary(self):
+        if self._transactions.get():
+            return True
+        if not self.sticky:
+            return False
+        session = Session.current()
+        if session is not None and session in self._sticky_sessions:
+            return True
+        written_at = self._written_at.get()
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    def _acquire(self):
+        with self._lock:
+            if self.strategy == 'least_connections':
+                index = min(range(len(self.replicas)), key=self._in_flight.__getitem__)
+            else:
+                index = next(self._turn) % len(self.replicas)
+            self._in_flight[index] += 1
+            return index
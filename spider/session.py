@@ -0,0 +1,110 @@
+"""
+This module handles the unit of work scope of loaded rows.
+
+Classes:
+- Session: A unit of work keeping a single row dictionary per table and primary key.
+"""
+
+from contextvars import ContextVar
+
+_current_session = ContextVar('spider_session', default=None)
+
+
+class Session:
+    """
+    A unit of work keeping a single row dictionary per table and primary key.
+
+    While a session is active, rows loaded by get, filter and batch loaders are stored in its
+    identity map, and a primary key lookup already in the map is answered without a query.
+    Sessions are bound to the current context, so concurrent threads and asyncio tasks each
+    see their own session.
+
+    Attributes:
+    - identity_map (dict): The loaded rows, keyed by (table, primary key).
+
+    Example:
+        >>> with Session():
+        ...     user = User().get(id=1)
+        ...     user is User().get(id=1)
+        True
+    """
+
+    def __init__(self):
+        self.identity_map = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_session.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_session.reset(self._tokens.pop())
+        if not self._tokens:
+            self.identity_map.clear()
+
+    @staticmethod
+    def current():
+        """
+        Returns the session active in the current context.
+
+        Returns:
+        - Session or None: The active session, or None if there is none.
+        """
+        return _current_session.get()
+
+    def get(self, table, pk):
+        """
+        Returns the loaded row of a table with the given primary key.
+
+        Args:
+        - table (str): The table name.
+        - pk: The primary key of the row.
+
+        Returns:
+        - dict or None: The row, or None if it was not loaded in this session.
+        """
+        return self.identity_map.get((table, pk))
+
+    def add(self, table, row):
+        """
+        Stores a loaded row and returns the single dictionary representing it in this session.
+
+        If the row was already loaded, the existing dictionary is refreshed with the new values
+        and returned, so every caller shares the same object.
+
+        Args:
+        - table (str): The table name.
+        - row (dict): The loaded row.
+
+        Returns:
+        - dict: The dictionary representing the row in this session.
+        """
+        pk = row.get('id')
+        if pk is None:
+            return row
+        loaded = self.identity_map.get((table, pk))
+        if loaded is None:
+            self.identity_map[(table, pk)] = row
+            return row
+        loaded.update(row)
+        return loaded
+
+    def remove(self, table, pk):
+        """
+        Removes a row from the identity map.
+
+        Args:
+        - table (str): The table name.
+        - pk: The primary key of the row.
+        """
+        self.identity_map.pop((table, pk), None)
+
+    def expire(self, table):
+        """
+        Removes every row of a table from the identity map.
+
+        Args:
+        - table (str): The table name.
+        """
+        for key in [key for key in self.identity_map if key[0] == table]:
+            del self.identity_map[key]
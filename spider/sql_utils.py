@@ -1,6 +1,29 @@
 from spider.fields import *
+from spider.expressions import Expression, Q, compile_expression
 from spider.mysql.connection import MysqlConnection
+from spider.router import ReplicaRouter
 from datetime import datetime
+import json
+
+# Upper bound for bound parameters in a single statement (SQLite's historical SQLITE_MAX_VARIABLE_NUMBER).
+MAX_QUERY_PARAMS = 999
+
+# Primary key lookup statements, by (table, placeholder).
+_pk_statements = {}
+
+def uses_mysql(rdbms):
+    """
+    Tells whether a connection, or the primary of a ReplicaRouter, is a MySQL connection.
+
+    Args:
+    - rdbms: The connection set in a model's MetaData.
+
+    Returns:
+    - bool: True for MySQL, False otherwise.
+    """
+    if isinstance(rdbms, ReplicaRouter):
+        rdbms = rdbms.primary
+    return isinstance(rdbms, MysqlConnection)
 
 class SQLTypeGenerator:
     """
@@ -34,10 +57,12 @@ class SQLTypeGenerator:
             'FileField': lambda field: "VARCHAR(255)",
             'URLField': lambda field: "VARCHAR(255)",
             'ForeignKey': lambda field: f"INTEGER REFERENCES {field.to.__name__.lower()}(id)",
-            'TextField': lambda field: f"TEXT({field.max_length})",
+            'TextField': lambda field: "LONGBLOB" if field.compress else f"TEXT({field.max_length})",
             'EmailField': lambda field: f"VARCHAR({field.max_length})",
             'PasswordField': lambda field: f"VARCHAR({field.max_length})",
             'TimeField': lambda field: "TIME",
+            'JSONField': lambda field: "TEXT",
+            'BinaryField': lambda field: "LONGBLOB",
         }
 
         field_class_name = field.__class__.__name__
@@ -66,16 +91,19 @@ class TableSQL:
         rdbms = cls._meta.get('rdbms')
         fields_definitions = []
         sql_safely_password_store_table = None
-        auto_increment = ' AUTO_INCREMENT' if isinstance(rdbms, MysqlConnection) else ' AUTOINCREMENT'
+        auto_increment = ' AUTO_INCREMENT' if uses_mysql(rdbms) else ' AUTOINCREMENT'
 
         for field_name, field in cls._fields.items():
+            if isinstance(field, ManyToManyField):
+                continue
             if isinstance(field, PasswordField):
                 field_def = f"{field_name}ID {SQLTypeGenerator.get_sql_type(field)}"
             else:
                 field_def = f"{field_name} {SQLTypeGenerator.get_sql_type(field)}"
                 
             if isinstance(field, PasswordField):
-                sql_safely_password_store_table = f'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR({field.max_length}) NOT NULL, salt VARCHAR({field.salt_size}) NOT NULL);'
+                # The hash is stored with its parameters ('<params>$<hex>') and the salt as hex.
+                sql_safely_password_store_table = f'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR(255) NOT NULL, salt VARCHAR({2 * field.salt_size}) NOT NULL);'
             if field.primary_key:
                 field_def += ' PRIMARY KEY'
             if getattr(field, 'auto_increment', False):
@@ -88,9 +116,234 @@ class TableSQL:
                 field_def += f" DEFAULT {repr(field.default)}"
 
             fields_definitions.append(field_def)
+        for name, path in (cls._meta.get('generated_columns') or {}).items():
+            if uses_mysql(rdbms):
+                fields_definitions.append(f"{name} VARCHAR(255) GENERATED ALWAYS AS ({TableSQL.json_path_sql(cls, path)}) VIRTUAL")
+                fields_definitions.append(f"INDEX {cls.__class__.__name__.lower()}_{name} ({name})")
+            else:
+                fields_definitions.append(f"{name} GENERATED ALWAYS AS ({TableSQL.json_path_sql(cls, path)}) VIRTUAL")
         fields_sql = ",".join(fields_definitions)
         return f"CREATE TABLE IF NOT EXISTS {cls.__class__.__name__.lower()} ({fields_sql});", sql_safely_password_store_table
 
+    @staticmethod
+    def create_generated_indexes_sql(cls):
+        """
+        Generate SQL statements to index the generated columns declared in a model's MetaData.
+
+        MySQL indexes are declared in the CREATE TABLE statement instead.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - list: A list of CREATE INDEX SQL statements.
+        """
+        if uses_mysql(cls._meta.get('rdbms')):
+            return []
+        table = cls.__class__.__name__.lower()
+        return [
+            f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({name});"
+            for name in (cls._meta.get('generated_columns') or {})
+        ]
+
+    @staticmethod
+    def json_path_sql(cls, lookup):
+        """
+        Generate the SQL expression extracting a value from a JSONField.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - lookup (str): The field name followed by the keys of the path, e.g. 'data__user__id'.
+          Numeric keys index arrays, e.g. 'data__tags__0'.
+
+        Returns:
+        - str: The SQL expression, e.g. "json_extract(data, '$.user.id')".
+
+        Raises:
+        - ValueError: If the lookup does not start with a JSONField or a key is not a valid name.
+        """
+        field, *keys = lookup.split('__')
+        if not isinstance(cls._fields.get(field), JSONField) or not keys:
+            raise ValueError(f"{lookup} is not a path of a JSONField of {cls.__class__.__name__}.")
+        path = '$'
+        for key in keys:
+            if key.isdigit():
+                path += f"[{key}]"
+            elif key.isidentifier():
+                path += f".{key}"
+            else:
+                raise ValueError(f"{key} is not a valid JSON key in {lookup}.")
+        if uses_mysql(cls._meta.get('rdbms')):
+            return f"{field}->>'{path}'"
+        return f"json_extract({field}, '{path}')"
+
+    @staticmethod
+    def column_sql(cls, name):
+        """
+        Generate the SQL expression of a column name used in filter criteria.
+
+        Paths into a JSONField ('data__user__id') are compiled to a JSON extraction, or to the
+        generated column declared for the same path in the model's MetaData, so that its index is used.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - name (str): The column name or JSON path.
+
+        Returns:
+        - str: The SQL expression.
+        """
+        if '__' not in name or not isinstance(cls._fields.get(name.split('__', 1)[0]), JSONField):
+            return name
+        for column, path in (cls._meta.get('generated_columns') or {}).items():
+            if path == name:
+                return column
+        return TableSQL.json_path_sql(cls, name)
+
+    @staticmethod
+    def create_m2m_tables_sql(cls):
+        """
+        Generate SQL statements to create the junction tables of the ManyToManyField fields of a class.
+
+        Each junction table has a composite primary key on (source, target) and an index on
+        (target, source) so that the relationship can be read efficiently from both sides.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - list: A list of SQL statements, empty if the class has no ManyToManyField.
+        """
+        is_mysql = uses_mysql(cls._meta.get('rdbms'))
+        table = cls.__class__.__name__.lower()
+        statements = []
+
+        for field_name, field in cls._fields.items():
+            if not isinstance(field, ManyToManyField):
+                continue
+            target = field.to.__name__.lower()
+            through, source_column, target_column = TableSQL.m2m_table(table, field_name, target)
+            columns = (
+                f"{source_column} INTEGER NOT NULL REFERENCES {table}(id) ON DELETE CASCADE,"
+                f"{target_column} INTEGER NOT NULL REFERENCES {target}(id) ON DELETE CASCADE,"
+                f"PRIMARY KEY ({source_column},{target_column})"
+            )
+            index_name = f"{through}_{target_column}"
+            if is_mysql:
+                statements.append(
+                    f"CREATE TABLE IF NOT EXISTS {through} ({columns},"
+                    f"INDEX {index_name} ({target_column},{source_column}));"
+                )
+            else:
+                statements.append(f"CREATE TABLE IF NOT EXISTS {through} ({columns}) WITHOUT ROWID;")
+                statements.append(f"CREATE INDEX IF NOT EXISTS {index_name} ON {through} ({target_column},{source_column});")
+        return statements
+
+    @staticmethod
+    def search_table_sql(cls):
+        """
+        Generate SQL statement telling whether the full-text search table of a model exists.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - tuple: A tuple containing the SELECT SQL statement and a list with the search table name.
+        """
+        return "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", [f"{cls.__class__.__name__.lower()}_fts"]
+
+    @staticmethod
+    def create_search_sql(cls):
+        """
+        Generate SQL statements creating the SQLite FTS5 index of a model's search_fields.
+
+        The index is an external-content FTS5 table: it stores only the index, reads the text from
+        the model's table, and is kept up to date by triggers on insert, update and delete. The last
+        statement indexes the rows already in the table.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - list: A list of SQL statements, empty if the model has no search_fields.
+
+        Raises:
+        - ValueError: If a search field is not a CharField of the model, or the database is MySQL.
+        """
+        search_fields = list(cls._meta.get('search_fields') or [])
+        if not search_fields:
+            return []
+        if uses_mysql(cls._meta.get('rdbms')):
+            raise ValueError("search_fields require SQLite FTS5.")
+        for field in search_fields:
+            if not isinstance(cls._fields.get(field), CharField) or getattr(cls._fields[field], 'compress', False):
+                raise ValueError(f"{field} is not an uncompressed text field of {cls.__class__.__name__}.")
+
+        table = cls.__class__.__name__.lower()
+        fts = f"{table}_fts"
+        columns = ", ".join(search_fields)
+        new_values = ", ".join(f"new.{field}" for field in search_fields)
+        old_values = ", ".join(f"old.{field}" for field in search_fields)
+        delete_old = f"INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+        insert_new = f"INSERT INTO {fts} (rowid, {columns}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id');",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert_new} END;",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete_old} END;",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE ON {table} BEGIN {delete_old} {insert_new} END;",
+            f"INSERT INTO {fts} ({fts}) VALUES ('rebuild');",
+        ]
+
+    @staticmethod
+    def search_sql(cls, query, rank=True, limit=None, highlight=('<b>', '</b>')):
+        """
+        Generate SQL statement to search the full-text index of a model.
+
+        Each selected row has two extra columns: 'rank', its bm25 score (lower is more relevant),
+        and 'snippet', an excerpt of the best matching column with the matches highlighted.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - query (str): The FTS5 query, e.g. 'sqlite AND "full text"' or 'data*'.
+        - rank (bool): Whether the rows are ordered by relevance.
+        - limit (int, optional): The maximum number of rows to select.
+        - highlight (tuple): The text inserted before and after each match in the snippet.
+
+        Returns:
+        - tuple: A tuple containing the SELECT SQL statement and a list of values.
+        """
+        table = cls.__class__.__name__.lower()
+        fts = f"{table}_fts"
+        sql = (
+            f"SELECT {table}.*, bm25({fts}) AS rank, snippet({fts}, -1, ?, ?, '...', 16) AS snippet "
+            f"FROM {fts} JOIN {table} ON {table}.id = {fts}.rowid WHERE {fts} MATCH ?"
+        )
+        if rank:
+            sql += " ORDER BY rank"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql + ";", [highlight[0], highlight[1], query]
+
+    @staticmethod
+    def seed_sequence_sql(cls, start):
+        """
+        Generate SQL statement making the SQLite AUTOINCREMENT primary keys of a new table start after a given value.
+
+        The statement does nothing if the table already has a sequence.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - start (int): The value the next primary keys are greater than.
+
+        Returns:
+        - tuple: A tuple containing the INSERT SQL statement and its list of values.
+        """
+        table = cls.__class__.__name__.lower()
+        query = (
+            "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?);"
+        )
+        return query, [table, start, table]
+
     @staticmethod
     def insert_data_sql(cls):
         """
@@ -106,10 +359,12 @@ class TableSQL:
         fields = []
         values = []
         rdbms = cls._meta.get('rdbms')
-        _format_str = '%s' if isinstance(rdbms, MysqlConnection) else '?'
+        _format_str = '%s' if uses_mysql(rdbms) else '?'
         has_password_field = False
 
         for field, field_class in cls._fields.items():
+            if isinstance(field_class, ManyToManyField):
+                continue
             if hasattr(field_class, 'auto_increment'):
                 if not field_class.auto_increment:
                     fields.append(field)
@@ -142,6 +397,10 @@ class TableSQL:
                     value = value.__str__()
             if isinstance(field_class, DecimalField):
                 value = f"{value:.{field_class.decimal_places}f}"
+            if isinstance(field_class, JSONField) and value is not None and value is not field_class:
+                value = json.dumps(value)
+            if isinstance(field_class, TextField):
+                value = field_class.encode(value)
             if value is not None:
                 values.append(value)
 
@@ -151,28 +410,250 @@ class TableSQL:
         return normal_insert, has_password_field
 
     @staticmethod
-    def filter_data_sql(cls, kwargs):
+    def upsert_data_sql(cls, conflict_fields, update_fields=None):
+        """
+        Generate SQL statement to insert a row, or update the existing row it conflicts with.
+
+        SQLite uses 'ON CONFLICT (...) DO UPDATE' on the conflict fields, which must be covered by a
+        unique index. MySQL uses 'ON DUPLICATE KEY UPDATE', which applies to any unique key.
+
+        Args:
+        - cls (Model): The model instance holding the row to write.
+        - conflict_fields (list): The fields identifying an existing row.
+        - update_fields (list, optional): The fields overwritten on conflict. Defaults to every inserted
+          field other than the conflict fields; if empty, the existing row is left as is.
+
+        Returns:
+        - tuple: A tuple containing the INSERT SQL statement and a list of values.
+
+        Raises:
+        - ValueError: If a conflict or update field is not inserted by the statement.
+        """
+        (query, values), _ = TableSQL.insert_data_sql(cls)
+        columns = query[query.index('(') + 1:query.index(')')].split(',')
+        for field in [*conflict_fields, *(update_fields or [])]:
+            if field not in columns:
+                raise ValueError(f"{field} is not a field inserted into {cls.__class__.__name__.lower()}.")
+        if update_fields is None:
+            update_fields = [column for column in columns if column not in conflict_fields]
+
+        query = query.rstrip(';')
+        if uses_mysql(cls._meta.get('rdbms')):
+            assignments = [f"{field} = VALUES({field})" for field in update_fields] or [f"{conflict_fields[0]} = {conflict_fields[0]}"]
+            query += " ON DUPLICATE KEY UPDATE " + ", ".join(assignments)
+        elif update_fields:
+            assignments = [f"{field} = excluded.{field}" for field in update_fields]
+            query += f" ON CONFLICT ({','.join(conflict_fields)}) DO UPDATE SET " + ", ".join(assignments)
+        else:
+            query += f" ON CONFLICT ({','.join(conflict_fields)}) DO NOTHING"
+        return query + ";", values
+
+    @staticmethod
+    def insert_password_sql(cls, field_name):
+        """
+        Generate SQL statements to store the hash of a password field.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - field_name (str): The name of the PasswordField.
+
+        Returns:
+        - tuple: A tuple containing the UPDATE SQL statement linking the row to its password,
+          bound to (pk, pk), and the INSERT SQL statement for the passwords table, bound to
+          (pk, hash, salt).
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        table = cls.__class__.__name__.lower()
+        return (
+            f"UPDATE {table} SET {field_name}ID = {_format_str} WHERE id = {_format_str};",
+            f"INSERT INTO passwords (id, hash, salt) VALUES ({_format_str},{_format_str},{_format_str});"
+        )
+
+    @staticmethod
+    def select_password_sql(cls, pk):
+        """
+        Generate SQL statement to read the stored hash of a password.
+
+        Args:
+        - cls (Model): The model class whose connection defines the placeholder style.
+        - pk (int): The primary key of the password.
+
+        Returns:
+        - tuple: A tuple containing the SELECT SQL statement and a list with the primary key.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        return f"SELECT hash, salt FROM passwords WHERE id = {_format_str};", [pk]
+
+    @staticmethod
+    def update_password_sql(cls, pk, hash, salt):
+        """
+        Generate SQL statement to replace the stored hash of a password.
+
+        Args:
+        - cls (Model): The model class whose connection defines the placeholder style.
+        - pk (int): The primary key of the password.
+        - hash (str): The new encoded hash.
+        - salt (str): The new hexadecimal salt.
+
+        Returns:
+        - tuple: A tuple containing the UPDATE SQL statement and a list of values.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        return f"UPDATE passwords SET hash = {_format_str}, salt = {_format_str} WHERE id = {_format_str};", [hash, salt, pk]
+
+    @staticmethod
+    def filter_data_sql(cls, kwargs, q_objects=(), limit=None):
         """
         Generate SQL statement to filter data based on provided criteria.
 
         Args:
         - cls (Model): The model class that defines the table schema.
         - kwargs (dict): Dictionary of filter criteria.
+        - q_objects (tuple, optional): Q objects combined with the criteria using AND.
+        - limit (int, optional): The maximum number of rows to select.
+
+        Returns:
+        - tuple: A tuple containing the SELECT SQL statement and a list of values.
+        """
+        where, values = TableSQL.where_sql(cls, kwargs, q_objects)
+        query = f"SELECT * FROM {cls.__class__.__name__.lower()} WHERE " + where
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+
+        return query, values
+
+    @staticmethod
+    def select_pk_sql(cls):
+        """
+        Generate SQL statement to select a row by primary key.
+
+        The statement text is built once per table and database, so that the driver's prepared
+        statement cache (per connection, keyed by the SQL text) compiles it only once.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - str: The SELECT SQL statement, with one parameter for the primary key.
+        """
+        table = cls.__class__.__name__.lower()
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        key = (table, _format_str)
+        query = _pk_statements.get(key)
+        if query is None:
+            query = _pk_statements.setdefault(key, f"SELECT * FROM {table} WHERE id = {_format_str};")
+        return query
+
+    @staticmethod
+    def count_data_sql(cls, kwargs, q_objects=()):
+        """
+        Generate SQL statement to count the rows matching the provided criteria.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - kwargs (dict): Dictionary of filter criteria. If empty, all rows are counted.
+        - q_objects (tuple, optional): Q objects combined with the criteria using AND.
+
+        Returns:
+        - tuple: A tuple containing the SELECT COUNT SQL statement and a list of values.
+        """
+        query = f"SELECT COUNT(*) FROM {cls.__class__.__name__.lower()}"
+        if not kwargs and not q_objects:
+            return query + ";", []
+        where, values = TableSQL.where_sql(cls, kwargs, q_objects)
+        return query + " WHERE " + where, values
+
+    @staticmethod
+    def select_page_sql(cls, kwargs, after, limit):
+        """
+        Generate SQL statement to select a page of rows ordered by primary key.
+
+        Pages are read by keyset pagination: each page starts after the last primary key
+        of the previous one, so no connection has to stay open between pages.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - kwargs (dict): Dictionary of filter criteria. If empty, all rows are selected.
+        - after: The last primary key of the previous page, or None for the first page.
+        - limit (int): The maximum number of rows in the page.
 
         Returns:
         - tuple: A tuple containing the SELECT SQL statement and a list of values.
         """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        conditions = []
+        values = []
+        if kwargs:
+            where, values = TableSQL.where_sql(cls, kwargs)
+            conditions.append(where)
+        if after is not None:
+            conditions.append(f"id > {_format_str}")
+            values.append(after)
+        query = f"SELECT * FROM {cls.__class__.__name__.lower()}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query + f" ORDER BY id LIMIT {int(limit)};", values
+
+    @staticmethod
+    def check_lookup(cls, key):
+        """
+        Check that a filter criterion can be compiled against the stored values of its field.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - key (str): The field name, optionally followed by a lookup.
+
+        Raises:
+        - ValueError: If the field is a compressed TextField and the lookup is not __isnull.
+        """
+        field = cls._fields.get(key.split('__', 1)[0])
+        if isinstance(field, TextField) and field.compress and not key.endswith('__isnull'):
+            raise ValueError(f"{key}: compressed fields can only be filtered with __isnull.")
+
+    @staticmethod
+    def where_sql(cls, kwargs, q_objects=()):
+        """
+        Generate the conditions of a WHERE clause based on provided criteria.
+
+        Keys are field names, optionally followed by a lookup: __lt, __lte, __gt, __gte, __bt (a pair of
+        bounds), __in (a list of values), __startswith (compiled to a range so indexes are used),
+        __contains, __icontains, __isnull (True or False) and __ne.
+
+        Compressed TextFields only support __isnull, since their values are stored compressed.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - kwargs (dict): Dictionary of filter criteria.
+        - q_objects (tuple, optional): Q objects, each compiled into one more condition.
+
+        Returns:
+        - tuple: A tuple containing the conditions joined with AND and a list of values.
+
+        Raises:
+        - ValueError: If a compressed TextField is filtered by another lookup than __isnull.
+        """
         kwargs__lt = {}  # less than
         kwargs__lte = {}  # less than or equal to
         kwargs__gt = {}  # greater than
         kwargs__gte = {}  # greater than or equal to
         kwargs__eq = {}  # equal to
         kwargs__bt = {}  # between
+        kwargs__in = {}  # in a list of values
+        kwargs__startswith = {}  # starts with a prefix
+        kwargs__contains = {}  # contains a substring
+        kwargs__icontains = {}  # contains a substring, ignoring case
+        kwargs__isnull = {}  # is (not) NULL
+        kwargs__ne = {}  # not equal to
         params = []
         values = []
-        _format_str = '%s' if isinstance(cls._meta.get('rdbms'), MysqlConnection) else '?'
+        is_mysql = uses_mysql(cls._meta.get('rdbms'))
+        _format_str = '%s' if is_mysql else '?'
+
+        def column(name):
+            return TableSQL.column_sql(cls, name)
 
         for key, value in kwargs.items():
+            TableSQL.check_lookup(cls, key)
             if key.endswith('__lt'):
                 kwargs__lt[key] = value
             elif key.endswith('__gt'):
@@ -183,44 +664,121 @@ class TableSQL:
                 kwargs__gte[key] = value
             elif key.endswith('__bt'):
                 kwargs__bt[key] = value
+            elif key.endswith('__in'):
+                kwargs__in[key] = value
+            elif key.endswith('__startswith'):
+                kwargs__startswith[key] = value
+            elif key.endswith('__icontains'):
+                kwargs__icontains[key] = value
+            elif key.endswith('__contains'):
+                kwargs__contains[key] = value
+            elif key.endswith('__isnull'):
+                kwargs__isnull[key] = value
+            elif key.endswith('__ne'):
+                kwargs__ne[key] = value
             else:
                 kwargs__eq[key] = value
 
-        if kwargs__eq:
-            for eq_param in [f"{key} = {_format_str}" for key in kwargs__eq.keys()]:
-                params.append(eq_param)
-            for value in kwargs__eq.values():
-                values.append(value)
-        if kwargs__lt:
-            for lt_param in [f"{key.removesuffix('__lt')} < {_format_str}" for key in kwargs__lt.keys()]:
-                params.append(lt_param)
-            for value in kwargs__lt.values():
-                values.append(value)
-        if kwargs__lte:
-            for lte_param in [f"{key.removesuffix('__lte')} <= {_format_str}" for key in kwargs__lte.keys()]:
-                params.append(lte_param)
-            for value in kwargs__lte.values():
-                values.append(value)
-        if kwargs__gt:
-            for gt_params in [f"{key.removesuffix('__gt')} > {_format_str}" for key in kwargs__gt.keys()]:
-                params.append(gt_params)
-            for value in kwargs__gt.values():
-                values.append(value)
-        if kwargs__gte:
-            for gte_params in [f"{key.removesuffix('__gte')} >= {_format_str}" for key in kwargs__gte.keys()]:
-                params.append(gte_params)
-            for value in kwargs__gte.values():
+        for group, suffix, operator in (
+            (kwargs__eq, '', '='),
+            (kwargs__lt, '__lt', '<'),
+            (kwargs__lte, '__lte', '<='),
+            (kwargs__gt, '__gt', '>'),
+            (kwargs__gte, '__gte', '>='),
+        ):
+            for key, value in group.items():
+                sql, sql_values = compile_expression(value, _format_str)
+                params.append(f"{column(key.removesuffix(suffix) if suffix else key)} {operator} {sql}")
+                values.extend(sql_values)
+        for key, value in kwargs__bt.items():
+            low, low_values = compile_expression(value[0], _format_str)
+            high, high_values = compile_expression(value[1], _format_str)
+            params.append(f"{column(key.removesuffix('__bt'))} BETWEEN {low} AND {high}")
+            values.extend(low_values + high_values)
+        for key, value in kwargs__in.items():
+            name = column(key.removesuffix('__in'))
+            value = list(value)
+            if not value:
+                params.append("1 = 0")
+            elif not is_mysql and len(value) > MAX_QUERY_PARAMS:
+                # Too many values for one statement: bind them as a single JSON array read as a table.
+                params.append(f"{name} IN (SELECT value FROM json_each({_format_str}))")
+                values.append(json.dumps(value))
+            else:
+                params.append(f"{name} IN ({','.join([_format_str] * len(value))})")
+                values.extend(value)
+        for key, value in kwargs__startswith.items():
+            # A range instead of LIKE 'prefix%', so that an index on the column can be used.
+            name = column(key.removesuffix('__startswith'))
+            if value and ord(value[-1]) < 0x10FFFF:
+                params.append(f"{name} >= {_format_str} AND {name} < {_format_str}")
+                values.extend([value, value[:-1] + chr(ord(value[-1]) + 1)])
+            else:
+                params.append(f"{name} LIKE {_format_str}" + ("" if is_mysql else " ESCAPE '\\'"))
+                values.append(TableSQL.escape_like(value) + '%')
+        for key, value in kwargs__contains.items():
+            name = column(key.removesuffix('__contains'))
+            if is_mysql:
+                params.append(f"{name} LIKE BINARY {_format_str}")
+                values.append('%' + TableSQL.escape_like(value) + '%')
+            else:
+                # SQLite's LIKE ignores case, instr does not.
+                params.append(f"instr({name}, {_format_str}) > 0")
                 values.append(value)
-        if kwargs__bt:
-            for bt_params in [f"{key.removesuffix('__bt')} BETWEEN {_format_str} AND {_format_str}" for key in kwargs__bt.keys()]:
-                params.append(bt_params)
-            for value in kwargs__bt.values():
-                values.append(value[0])
-                values.append(value[1])
+        for key, value in kwargs__icontains.items():
+            name = column(key.removesuffix('__icontains'))
+            escape = "" if is_mysql else " ESCAPE '\\'"
+            params.append(f"LOWER({name}) LIKE LOWER({_format_str}){escape}")
+            values.append('%' + TableSQL.escape_like(value) + '%')
+        for key, value in kwargs__isnull.items():
+            params.append(f"{column(key.removesuffix('__isnull'))} IS {'NULL' if value else 'NOT NULL'}")
+        for key, value in kwargs__ne.items():
+            sql, sql_values = compile_expression(value, _format_str)
+            params.append(f"{column(key.removesuffix('__ne'))} <> {sql}")
+            values.extend(sql_values)
+        for q in q_objects:
+            sql, sql_values = TableSQL.q_sql(cls, q)
+            params.append(sql)
+            values.extend(sql_values)
 
-        query = f"SELECT * FROM {cls.__class__.__name__.lower()} WHERE " + " AND ".join(params)
+        return " AND ".join(params), values
 
-        return query, values
+    @staticmethod
+    def q_sql(cls, q):
+        """
+        Generate the condition of a Q object, with its children joined by its connector.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - q (Q): The Q object.
+
+        Returns:
+        - tuple: A tuple containing the parenthesized condition and a list of values.
+        """
+        parts = []
+        values = []
+        for child in q.children:
+            if isinstance(child, Q):
+                sql, child_values = TableSQL.q_sql(cls, child)
+            else:
+                sql, child_values = TableSQL.where_sql(cls, dict([child]))
+            parts.append(sql)
+            values.extend(child_values)
+        sql = f" {q.connector} ".join(parts) if parts else "1 = 1"
+        return (f"NOT ({sql})" if q.negated else f"({sql})"), values
+
+    @staticmethod
+    def escape_like(value):
+        """
+        Escape the wildcards of a LIKE pattern, using backslash as the escape character.
+
+        Args:
+        - value (str): The text to match literally.
+
+        Returns:
+        - str: The escaped text.
+        """
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
 
     @staticmethod
     def select_all_sql(cls):
@@ -235,6 +793,190 @@ class TableSQL:
         """
         return f"SELECT * FROM {cls.__class__.__name__.lower()};"
 
+    @staticmethod
+    def select_in_sql(cls, table, column, values):
+        """
+        Generate SQL statements to select rows whose column matches any of the given values.
+
+        The values are split into chunks so that no statement exceeds MAX_QUERY_PARAMS bound parameters.
+
+        Args:
+        - cls (Model): The model instance whose connection defines the placeholder style.
+        - table (str): The table to select from.
+        - column (str): The column to match against.
+        - values (list): The values to match.
+
+        Returns:
+        - list: A list of tuples, each containing a SELECT SQL statement and its list of values.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        queries = []
+        for start in range(0, len(values), MAX_QUERY_PARAMS):
+            chunk = list(values[start:start + MAX_QUERY_PARAMS])
+            placeholders = ",".join([_format_str for _ in chunk])
+            queries.append((f"SELECT * FROM {table} WHERE {column} IN ({placeholders});", chunk))
+        return queries
+
+    @staticmethod
+    def select_through_in_sql(cls, table, through, key_column, join_column, values):
+        """
+        Generate SQL statements to select rows related through a junction table.
+
+        Each returned row carries the junction key under the '_prefetch_key' column, followed by
+        all columns of the related table. The values are chunked like in select_in_sql.
+
+        Args:
+        - cls (Model): The model instance whose connection defines the placeholder style.
+        - table (str): The related table to select from.
+        - through (str): The junction table.
+        - key_column (str): The junction column matched against the values.
+        - join_column (str): The junction column referencing the related table's id.
+        - values (list): The values to match.
+
+        Returns:
+        - list: A list of tuples, each containing a SELECT SQL statement and its list of values.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        queries = []
+        for start in range(0, len(values), MAX_QUERY_PARAMS):
+            chunk = list(values[start:start + MAX_QUERY_PARAMS])
+            placeholders = ",".join([_format_str for _ in chunk])
+            queries.append((
+                f"SELECT {through}.{key_column} AS _prefetch_key, {table}.* FROM {table} "
+                f"INNER JOIN {through} ON {table}.id = {through}.{join_column} "
+                f"WHERE {through}.{key_column} IN ({placeholders});",
+                chunk
+            ))
+        return queries
+
+    @staticmethod
+    def m2m_table(source, field_name, target):
+        """
+        Generate the junction table and column names of a many-to-many relationship.
+
+        Args:
+        - source (str): The table declaring the ManyToManyField.
+        - field_name (str): The name of the ManyToManyField.
+        - target (str): The table the field points to.
+
+        Returns:
+        - tuple: A tuple containing the junction table name, the column referencing the source
+          table and the column referencing the target table.
+        """
+        if source == target:
+            return f"{source}_{field_name}", f"from_{source}_id", f"to_{target}_id"
+        return f"{source}_{field_name}", f"{source}_id", f"{target}_id"
+
+    @staticmethod
+    def m2m_add_sql(cls, through, source_column, target_column, source_id, target_ids):
+        """
+        Generate SQL statements to link a source row to many target rows in a junction table.
+
+        Links that already exist are ignored. Rows are written with multi-row VALUES lists,
+        chunked so that no statement exceeds MAX_QUERY_PARAMS bound parameters.
+
+        Args:
+        - cls (Model): The model instance whose connection defines the SQL dialect.
+        - through (str): The junction table.
+        - source_column (str): The junction column referencing the source table.
+        - target_column (str): The junction column referencing the target table.
+        - source_id (int): The primary key of the source row.
+        - target_ids (list): The primary keys of the target rows.
+
+        Returns:
+        - list: A list of tuples, each containing an INSERT SQL statement and its list of values.
+        """
+        is_mysql = uses_mysql(cls._meta.get('rdbms'))
+        _format_str = '%s' if is_mysql else '?'
+        insert = 'INSERT IGNORE INTO' if is_mysql else 'INSERT OR IGNORE INTO'
+        rows_per_query = MAX_QUERY_PARAMS // 2
+        queries = []
+        for start in range(0, len(target_ids), rows_per_query):
+            chunk = target_ids[start:start + rows_per_query]
+            placeholders = ",".join([f"({_format_str},{_format_str})" for _ in chunk])
+            values = []
+            for target_id in chunk:
+                values.extend([source_id, target_id])
+            queries.append((f"{insert} {through} ({source_column},{target_column}) VALUES {placeholders};", values))
+        return queries
+
+    @staticmethod
+    def m2m_remove_sql(cls, through, source_column, target_column, source_id, target_ids=None):
+        """
+        Generate SQL statements to unlink a source row from target rows in a junction table.
+
+        Args:
+        - cls (Model): The model instance whose connection defines the placeholder style.
+        - through (str): The junction table.
+        - source_column (str): The junction column referencing the source table.
+        - target_column (str): The junction column referencing the target table.
+        - source_id (int): The primary key of the source row.
+        - target_ids (list, optional): The primary keys of the target rows. If None, all links
+          of the source row are removed.
+
+        Returns:
+        - list: A list of tuples, each containing a DELETE SQL statement and its list of values.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        if target_ids is None:
+            return [(f"DELETE FROM {through} WHERE {source_column} = {_format_str};", [source_id])]
+        queries = []
+        for start in range(0, len(target_ids), MAX_QUERY_PARAMS - 1):
+            chunk = list(target_ids[start:start + MAX_QUERY_PARAMS - 1])
+            placeholders = ",".join([_format_str for _ in chunk])
+            queries.append((
+                f"DELETE FROM {through} WHERE {source_column} = {_format_str} AND {target_column} IN ({placeholders});",
+                [source_id] + chunk
+            ))
+        return queries
+
+    @staticmethod
+    def allocate_blob_sql(cls, field_name, pk, size):
+        """
+        Generate SQL statement to replace a BLOB value by zeros of the given size, ready to be written incrementally.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - field_name (str): The BinaryField name.
+        - pk (int): The primary key of the row.
+        - size (int): The size of the new value, in bytes.
+
+        Returns:
+        - tuple: A tuple containing the UPDATE SQL statement and its list of values.
+        """
+        return f"UPDATE {cls.__class__.__name__.lower()} SET {field_name} = zeroblob(?) WHERE id = ?;", [size, pk]
+
+    @staticmethod
+    def update_columns_sql(cls, columns):
+        """
+        Generate SQL statement to set columns of a row selected by primary key.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+        - columns (list): The names of the columns to set.
+
+        Returns:
+        - str: The UPDATE SQL statement, with one parameter per column followed by the primary key.
+        """
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
+        assignments = ", ".join(f"{column} = {_format_str}" for column in columns)
+        return f"UPDATE {cls.__class__.__name__.lower()} SET {assignments} WHERE id = {_format_str};"
+
+    @staticmethod
+    def vacuum_sql(cls):
+        """
+        Generate SQL statement reclaiming the space freed in the database file, or in the table on MySQL.
+
+        Args:
+        - cls (Model): The model class that defines the table schema.
+
+        Returns:
+        - str: The VACUUM or OPTIMIZE TABLE SQL statement.
+        """
+        if uses_mysql(cls._meta.get('rdbms')):
+            return f"OPTIMIZE TABLE {cls.__class__.__name__.lower()};"
+        return "VACUUM;"
+
     @staticmethod
     def delete_data_sql(cls, id):
         """
@@ -247,20 +989,28 @@ class TableSQL:
         Returns:
         - tuple: A tuple containing the DELETE SQL statement and a list with the ID value.
         """
-        _format_str = '%s' if isinstance(cls._meta.get('rdbms'), MysqlConnection) else '?'
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
         return f"DELETE FROM {cls.__class__.__name__.lower()} WHERE id = {_format_str};", [id]
 
     
     def update_data_sql(self,cls,kwargs):    
         params:list = []
         values:list = []     
-        _format_str = '%s' if isinstance(cls._meta.get('rdbms'),MysqlConnection) else '?'
+        _format_str = '%s' if uses_mysql(cls._meta.get('rdbms')) else '?'
         
         field_to_update = [field for field in kwargs.keys() if self.get_field_type(field,cls)][0]        
         value_updated = [value for value in kwargs.values()][0]
 
         kwargs.pop(field_to_update) 
 
+        if isinstance(cls._fields[field_to_update], JSONField) and not isinstance(value_updated, Expression):
+            value_updated = json.dumps(value_updated)
+        if isinstance(cls._fields[field_to_update], DecimalField) and value_updated is not None and not isinstance(value_updated, Expression):
+            value_updated = f"{value_updated:.{cls._fields[field_to_update].decimal_places}f}"
+        if isinstance(cls._fields[field_to_update], TextField):
+            value_updated = cls._fields[field_to_update].encode(value_updated)
+        # The new value is bound, or computed by the database if it is an expression (e.g. F('views') + 1).
+        set_sql, values = compile_expression(value_updated, _format_str)
         cleaned_data = self.clean_data(cls,kwargs)        
         for key, value in cleaned_data.items():        
             params.append(f'{key} = {_format_str} ')
@@ -268,7 +1018,7 @@ class TableSQL:
            
            
 
-        query = f"UPDATE {cls.__class__.__name__.lower()} SET {field_to_update} = '{value_updated}' WHERE " + "AND ".join(params)        
+        query = f"UPDATE {cls.__class__.__name__.lower()} SET {field_to_update} = {set_sql} WHERE " + "AND ".join(params)        
         
         return query,values
 
@@ -276,6 +1026,7 @@ class TableSQL:
     def clean_data(self,cls,kwargs):
         cleaned_data = {}
         for key, value in kwargs.items():
+            TableSQL.check_lookup(cls, key)
             field_type = self.get_field_type(key,cls)
 
             if isinstance(field_type,DecimalField):  
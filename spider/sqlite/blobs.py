@@ -0,0 +1,75 @@
+__all__ = ['DEFAULT_CHUNK_SIZE', 'open_blob', 'copy_from_blob', 'copy_to_blob']
+
+# The number of bytes moved per read or write when streaming a BLOB.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+def open_blob(cursor, table, column, rowid, readonly=True):
+    """
+    Open a BLOB value for incremental reading and writing.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor of the connection the BLOB is opened on.
+        table (str): The table name.
+        column (str): The column holding the BLOB.
+        rowid (int): The rowid (the INTEGER PRIMARY KEY) of the row.
+        readonly (bool): Whether the BLOB is opened for reading only.
+
+    Returns:
+        sqlite3.Blob: A file-like, seekable handle on the value. Its size cannot change.
+
+    Raises:
+        NotImplementedError: If sqlite3 does not support incremental BLOB I/O (Python 3.11 or later).
+    """
+    conn = cursor.connection
+    if not hasattr(conn, 'blobopen'):
+        raise NotImplementedError("Streaming BLOBs requires Python 3.11 or later.")
+    return conn.blobopen(table, column, rowid, readonly=readonly)
+
+def copy_from_blob(blob, out, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Copy a BLOB, from its current position, to a file object or a writable buffer, one chunk at a time.
+
+    Args:
+        blob (sqlite3.Blob): The open BLOB.
+        out: A file object with a write() method, or a writable buffer (bytearray, memoryview) large enough.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        int: The number of bytes copied.
+    """
+    target = None if hasattr(out, 'write') else memoryview(out).cast('B')
+    copied = 0
+    while True:
+        chunk = blob.read(chunk_size)
+        if not chunk:
+            return copied
+        if target is None:
+            out.write(chunk)
+        else:
+            target[copied:copied + len(chunk)] = chunk
+        copied += len(chunk)
+
+def copy_to_blob(blob, source, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Copy a file object or a buffer into a BLOB, from its current position, one chunk at a time.
+
+    Args:
+        blob (sqlite3.Blob): The BLOB, open for writing and large enough.
+        source: A file object with a read() method, or a buffer (bytes, bytearray, memoryview).
+        chunk_size (int): The number of bytes written at a time.
+
+    Returns:
+        int: The number of bytes copied.
+    """
+    if not hasattr(source, 'read'):
+        view = memoryview(source).cast('B')
+        for offset in range(0, len(view), chunk_size):
+            blob.write(view[offset:offset + chunk_size])
+        return len(view)
+    copied = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return copied
+        blob.write(chunk)
+        copied += len(chunk)
@@ -0,0 +1,161 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+__all__ = ['GroupCommitWriter']
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """
+    A writer thread committing the writes of many callers together.
+
+    Each write is a function receiving a cursor. Writes are queued and run by a single thread on its own
+    connection, each inside a savepoint so that a failing write is rolled back alone. The transaction is
+    committed once max_batch writes are collected or interval_ms milliseconds have passed since the first
+    one, and every caller returns once the batch holding its write is committed. This spreads the cost of
+    one fsync over all the writes of a batch.
+
+    Attributes:
+        interval_ms (float): The maximum time, in milliseconds, a write waits for other writes to join its batch.
+        max_batch (int): The maximum number of writes committed together.
+    """
+
+    def __init__(self, connect, interval_ms=5, max_batch=100) -> None:
+        """
+        Initialize the GroupCommitWriter object.
+
+        Parameters:
+            connect (callable): A function returning a new sqlite3.Connection for the writer thread.
+            interval_ms (float): The maximum time, in milliseconds, a write waits for other writes to join its batch.
+            max_batch (int): The maximum number of writes committed together.
+        """
+        self._connect = connect
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func):
+        """
+        Run a write on the writer thread and wait until it is committed.
+
+        Parameters:
+            func (callable): A function receiving a cursor and performing the write.
+
+        Returns:
+            The value returned by the function.
+
+        Raises:
+            Exception: Any exception raised by the function, by the commit, or by the writer thread.
+        """
+        future = Future()
+        with self._lock:
+            # The write is queued while the lock is held, so a dying writer thread either fails it
+            # or has already been replaced.
+            self._start()
+            self._queue.put((func, future))
+        return future.result()
+
+    def close(self) -> None:
+        """
+        Commit the pending writes and stop the writer thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='spider-group-commit', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.interval_ms / 1000
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        batch = []
+        try:
+            conn = self._connect()
+            try:
+                conn.isolation_level = None
+                cursor = conn.cursor()
+                stop = False
+                while not stop:
+                    batch, stop = self._collect()
+                    if batch:
+                        self._commit(conn, cursor, batch)
+                    batch = []
+            finally:
+                conn.close()
+        except BaseException as e:
+            self._fail(batch, e)
+
+    def _fail(self, batch, error) -> None:
+        # The thread is dying: the writes it holds and the queued ones are failed, and the next
+        # submit() starts a new thread.
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+            pending = list(batch)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    pending.append(item)
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _commit(self, conn, cursor, batch) -> None:
+        done = []
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for func, future in batch:
+            cursor.execute('SAVEPOINT group_commit_write')
+            try:
+                result = func(cursor)
+            except BaseException as e:
+                cursor.execute('ROLLBACK TO group_commit_write')
+                cursor.execute('RELEASE group_commit_write')
+                future.set_exception(e)
+            else:
+                cursor.execute('RELEASE group_commit_write')
+                done.append((future, result))
+        try:
+            cursor.execute('COMMIT')
+        except BaseException as e:
+            conn.rollback()
+            for future, _ in done:
+                future.set_exception(e)
+        else:
+            for future, result in done:
+                future.set_result(result)
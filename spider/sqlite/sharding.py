@@ -0,0 +1,122 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from spider.sqlite.sqlite_connection import SQLIteConnection
+
+__all__ = ['ShardedConnection', 'SHARD_ID_SPACE']
+
+# Auto-increment primary keys of shard i start at i * SHARD_ID_SPACE, so they are unique across shards.
+SHARD_ID_SPACE = 2 ** 40
+
+def _merge(results):
+    results = [result for result in results if result is not None]
+    if not results:
+        return None
+    if all(isinstance(result, list) for result in results):
+        return [item for result in results for item in result]
+    if all(isinstance(result, int) and not isinstance(result, bool) for result in results):
+        return sum(results)
+    return results[0]
+
+class ShardedConnection:
+    """
+    Spreads the rows of a model across several SQLite database files.
+
+    A model using this connection declares a shard_key in its MetaData. Inserts, and reads, updates and
+    deletes filtering on the shard key with an exact value, go to the one shard the key hashes to. Any other
+    operation fans out to every shard in parallel and the results are merged: row lists are concatenated
+    (iterate merges them in primary key order), counts are summed. Each shard has its own writer, so writes
+    to different shards do not wait for each other.
+
+    The shards hold auto-increment primary keys in disjoint ranges of SHARD_ID_SPACE keys, so that 'id'
+    stays unique across the model.
+
+    Attributes:
+        shards (list): The SQLIteConnection of each shard.
+    """
+
+    def __init__(self, databases, **options) -> None:
+        """
+        Initialize the ShardedConnection object.
+
+        Args:
+            databases (list): The paths of the shard database files. Their order must never change.
+            options: Keyword arguments passed to the SQLIteConnection of each shard, e.g. profile or pool_size.
+        """
+        if not databases:
+            raise ValueError("A sharded connection needs at least one database.")
+        self.shards = [SQLIteConnection(database, **options) for database in databases]
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix='spider-shard')
+
+    def shard_index(self, value) -> int:
+        """
+        Compute the shard holding a shard key value.
+
+        The hash is stable across processes, unlike hash().
+
+        Args:
+            value: The shard key value.
+
+        Returns:
+            int: The index of the shard in shards.
+        """
+        return zlib.crc32(str(value).encode()) % len(self.shards)
+
+    def shard_for(self, value) -> SQLIteConnection:
+        """
+        Get the connection of the shard holding a shard key value.
+
+        Args:
+            value: The shard key value.
+
+        Returns:
+            SQLIteConnection: The connection of the shard.
+        """
+        return self.shards[self.shard_index(value)]
+
+    def fan_out(self, method, funcs):
+        """
+        Run one function per shard in parallel.
+
+        Args:
+            method (str): The connection method running each function, 'run_read' or 'run_write'.
+            funcs (dict): The function to run, receiving a cursor, by shard index.
+
+        Returns:
+            dict: The value returned by each function, by shard index.
+        """
+        futures = {index: self._executor.submit(getattr(self.shards[index], method), func) for index, func in funcs.items()}
+        return {index: future.result() for index, future in futures.items()}
+
+    def run_read(self, func):
+        """
+        Run a read on every shard in parallel and merge the results.
+
+        Args:
+            func (callable): A function receiving a cursor and performing the reads.
+
+        Returns:
+            The merged values returned by the function: lists are concatenated, integers summed, and any
+            other value is the first one that is not None.
+        """
+        return _merge(self.fan_out('run_read', dict.fromkeys(range(len(self.shards)), func)).values())
+
+    def run_write(self, func):
+        """
+        Run a write on every shard in parallel and merge the results, as run_read does.
+
+        Args:
+            func (callable): A function receiving a cursor and performing the write.
+
+        Returns:
+            The merged values returned by the function.
+        """
+        return _merge(self.fan_out('run_write', dict.fromkeys(range(len(self.shards)), func)).values())
+
+    def close(self) -> None:
+        """
+        Close every shard and stop the fan-out workers.
+        """
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown()
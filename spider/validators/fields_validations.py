@@ -1,3 +1,4 @@
+import json
 from decimal import Decimal
 from datetime import date, datetime, time
 
@@ -305,3 +306,43 @@ def validate_password(value, hash, salt, max_length):
     if not isinstance(salt, bytes):
         raise ValidationError(f"salt must be a bytes instance.")
     return value
+
+
+def validate_json(value):
+    """
+    Validate that the value can be stored as JSON.
+
+    Args:
+        value: The value to be validated.
+
+    Returns:
+        The value, unchanged.
+
+    Raises:
+        ValidationError: If the value cannot be serialized to JSON.
+    """
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Value must be serializable to JSON: {value!r}.")
+    return value
+
+
+def validate_binary(value):
+    """
+    Validate that the value is bytes-like.
+
+    Args:
+        value: The value to be validated.
+
+    Returns:
+        bytes: The value as bytes, or None.
+
+    Raises:
+        ValidationError: If the value is not bytes, bytearray or memoryview.
+    """
+    if value is None:
+        return value
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        raise ValidationError(f"Value must be bytes-like: {type(value).__name__}.")
+    return bytes(value)
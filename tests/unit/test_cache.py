@@ -0,0 +1,43 @@
+import time
+
+from spider.cache import LocalCache
+
+
+def test_local_cache_lru_eviction():
+    cache = LocalCache(maxsize=2)
+    cache.set('a', 1, ['product'])
+    cache.set('b', 2, ['product'])
+    cache.get('a')
+    cache.set('c', 3, ['product'])
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+def test_local_cache_ttl():
+    cache = LocalCache(ttl=0.01)
+    cache.set('a', 1, ['product'])
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_local_cache_invalidate_table():
+    cache = LocalCache()
+    cache.set('a', 1, ['product'])
+    cache.set('b', 2, ['user'])
+    cache.invalidate('product')
+
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+def test_local_cache_skips_value_read_before_invalidation():
+    cache = LocalCache()
+    version = cache.version(['product'])
+    cache.invalidate('product')
+    cache.set('a', 1, ['product'], version)
+
+    assert cache.get('a') is None
+    version = cache.version(['product'])
+    cache.set('a', 2, ['product'], version)
+    assert cache.get('a') == 2
@@ -1,3 +1,11 @@
+import asyncio
+import contextvars
+import hashlib
+import io
+import sqlite3
+import threading
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 import os 
 import sys
@@ -7,8 +15,14 @@ for root, dirs, files in os.walk(path):
     for _dir in dirs:
         sys.path.append(_dir)
 
+from spider.cache import LocalCache
+from spider.expressions import F, Q
 from spider.models import Model
+from spider.mysql.connection import MysqlConnection
 from spider import fields
+from spider.router import ReplicaRouter
+from spider.session import Session
+from spider.sqlite.sharding import ShardedConnection
 from spider.sqlite.sqlite_connection import SQLIteConnection
 
 class Product(Model):
@@ -29,3 +43,751 @@ def test_get_not_found(id=10e100):
     with pytest.raises(ValueError):
         product = Product().get(id=id)
    
+
+class Author(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    name = fields.CharField(max_length=50)
+
+class Book(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    title = fields.CharField(max_length=50)
+    author = fields.ForeignKey(to=Author)
+
+def test_prefetch_related_reverse_foreign_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Author().create_table()
+    Book().create_table()
+    Author(name='Ana').save()
+    Author(name='Rui').save()
+    Book(title='First', author=1).save()
+    Book(title='Second', author=1).save()
+
+    authors = Author().prefetch_related('book_set').filter(id__gte=1)
+
+    assert [book['title'] for book in authors[0]['book_set']] == ['First', 'Second']
+    assert authors[1]['book_set'] == []
+
+class Tag(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    label = fields.CharField(max_length=50)
+
+class Post(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    title = fields.CharField(max_length=50)
+    tags = fields.ManyToManyField(to=Tag, related_name='posts')
+
+def test_many_to_many_add_remove_set(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+    Post().create_table()
+    for label in ['a', 'b', 'c']:
+        Tag(label=label).save()
+    post = Post(title='Hello')
+    post.save()
+
+    post.tags.add(1, 2, 3)
+    post.tags.remove(2)
+    assert [tag['label'] for tag in post.tags.all()] == ['a', 'c']
+
+    post.tags.set([2])
+    assert [tag['label'] for tag in post.tags.all()] == ['b']
+    assert Tag().prefetch_related('posts').get(id=2)['posts'] == [{'id': 1, 'title': 'Hello'}]
+
+def test_batch_loader_coalesces_lookups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+    for label in ['a', 'b']:
+        Tag(label=label).save()
+
+    with Tag().batch() as loader:
+        first, second, missing = loader.load_many([1, 2, 3])
+        assert loader._pending == [1, 2, 3]
+
+    assert loader._pending == []
+    assert first.result() == {'id': 1, 'label': 'a'}
+    assert second.result() == {'id': 2, 'label': 'b'}
+    with pytest.raises(ValueError):
+        missing.result()
+
+def test_session_identity_map(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+    Tag(label='a').save()
+
+    with Session() as session:
+        tag = Tag().get(id=1)
+        assert Tag().filter(id__gte=1)[0] is tag
+        assert Tag().get(id=1) is tag
+        Tag().delete(id=1)
+        assert session.get('tag', 1) is None
+
+    assert Session.current() is None
+
+class Account(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    name = fields.CharField(max_length=50)
+    password = fields.PasswordField(iterations=1000)
+
+def test_bulk_create_hashes_passwords(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Account().create_table()
+    accounts = [Account(name=f'user{i}', password=f'secret{i}') for i in range(3)]
+
+    Account().bulk_create(accounts)
+
+    assert [account.id for account in accounts] == [1, 2, 3]
+    with SQLIteConnection() as conn:
+        conn.execute('SELECT id, hash, salt FROM passwords ORDER BY id')
+        passwords = conn.fetchall()
+    assert [row[0] for row in passwords] == [1, 2, 3]
+    assert len({row[2] for row in passwords}) == 3
+
+def test_password_verify_and_rehash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Account().create_table()
+    account = Account(name='ana', password='secret')
+    account.save()
+
+    assert Account.password.verify(account, 'secret')
+    assert not Account.password.verify(account, 'wrong')
+
+    monkeypatch.setattr(Account.password, 'iterations', 2000)
+    assert Account.password.verify(Account().get(id=1), 'secret')
+    with SQLIteConnection() as conn:
+        conn.execute('SELECT hash FROM passwords WHERE id = 1')
+        assert conn.fetchone()[0].startswith('pbkdf2_sha256$2000$')
+
+def test_password_verify_legacy_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Account().create_table()
+    Account(name='bia', password='secret').save()
+    legacy = hashlib.pbkdf2_hmac('sha256', b'secret', (123).to_bytes(1, 'big'), 1000).hex()
+    with SQLIteConnection() as conn:
+        conn.execute('UPDATE passwords SET hash = ?, salt = ? WHERE id = 1', (legacy, '123'))
+
+    monkeypatch.setattr(Account.password, 'iterations', 3000)
+    assert not Account.password.verify(Account().get(id=1), 'wrong')
+    assert Account.password.verify(Account().get(id=1), 'secret')
+    with SQLIteConnection() as conn:
+        conn.execute('SELECT hash FROM passwords WHERE id = 1')
+        assert conn.fetchone()[0].startswith('pbkdf2_sha256$3000$')
+    assert Account.password.verify(Account().get(id=1), 'secret')
+
+def test_async_model_operations(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+
+    async def run():
+        await Tag().abulk_create([Tag(label=str(i)) for i in range(5)])
+        await Tag(label='last').asave()
+        rows = [row['id'] async for row in Tag().aiterate(chunk_size=2, id__gt=1)]
+        return await Tag().acount(), await Tag().aget(id=6), rows
+
+    total, last, rows = asyncio.run(run())
+
+    assert total == 6
+    assert last == {'id': 6, 'label': 'last'}
+    assert rows == [2, 3, 4, 5, 6]
+
+def test_aload_while_a_dispatch_is_queued(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+    Tag().bulk_create([Tag(label=str(i)) for i in range(3)])
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr('spider.aio._executor', executor)
+    busy = threading.Event()
+    gate = threading.Event()
+    connection = Tag()._rdbms()
+    run_read = connection.run_read
+    calls = []
+
+    def slow_first_read(func):
+        calls.append(func)
+        if len(calls) == 1:
+            gate.wait(5)
+        return run_read(func)
+
+    monkeypatch.setattr(connection, 'run_read', slow_first_read)
+
+    async def run():
+        loader = Tag().batch()
+        executor.submit(busy.wait)
+        executor.submit(busy.wait)
+        first = asyncio.ensure_future(loader.aload(1))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        second = asyncio.ensure_future(loader.aload(2))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        busy.set()
+        await asyncio.wait([first, second], return_when=asyncio.FIRST_COMPLETED)
+        gate.set()
+        return await asyncio.gather(first, second)
+
+    try:
+        assert asyncio.run(run()) == [{'id': 1, 'label': '0'}, {'id': 2, 'label': '1'}]
+    finally:
+        gate.set()
+        executor.shutdown()
+
+def test_mysql_run_write_rolls_back_on_error(monkeypatch):
+    calls = []
+
+    class Connection:
+        def cursor(self):
+            return None
+
+        def commit(self):
+            calls.append('commit')
+
+        def rollback(self):
+            calls.append('rollback')
+
+        def close(self):
+            calls.append('close')
+
+    monkeypatch.setattr('spider.mysql.connection.connect', lambda *args, **kwargs: Connection())
+    connection = MysqlConnection(host='0.0.0.0', user='root', password='root')
+    calls.clear()
+
+    def fail(cursor):
+        raise RuntimeError('duplicate key')
+
+    with pytest.raises(RuntimeError):
+        connection.run_write(fail)
+    assert calls[0] == 'rollback' and calls[-1] == 'close'
+    assert connection.conn is None
+
+def test_connection_state_is_per_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    connection = SQLIteConnection()
+    opened = threading.Barrier(2)
+    cursors = []
+
+    def use_connection():
+        with connection as cursor:
+            opened.wait()
+            cursors.append((cursor, connection.cursor))
+
+    threads = [threading.Thread(target=use_connection) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(cursor is current for cursor, current in cursors)
+    assert cursors[0][0] is not cursors[1][0]
+    assert connection.conn is None
+
+class Event(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    name = fields.CharField(max_length=50, unique=True)
+
+    class MetaData:
+        rdbms = SQLIteConnection(group_commit=True, commit_interval_ms=20)
+
+def test_group_commit_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Event().create_table()
+
+    threads = [threading.Thread(target=Event(name=f'event{i}').save) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with pytest.raises(Exception):
+        Event(name='event0').save()
+    assert Event().count() == 10
+    Event._meta['rdbms'].writer.close()
+
+def test_group_commit_writer_failure(tmp_path):
+    connection = SQLIteConnection(str(tmp_path / 'missing' / 'db.sqlite3'), group_commit=True)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for _ in range(2):
+            write = executor.submit(connection.run_write, lambda cursor: cursor.execute('SELECT 1;'))
+            with pytest.raises(sqlite3.OperationalError):
+                write.result(timeout=5)
+    connection.writer.close()
+
+def test_buffered_writer_flushes_on_close(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Tag().create_table()
+
+    with Tag().buffered(batch_size=4, flush_interval=10) as writer:
+        for i in range(10):
+            writer.add(Tag(label=f'tag{i}'))
+        writer.flush()
+        assert Tag().count() == 10
+        writer.add(Tag(label='tag10'))
+
+    assert Tag().count() == 11
+    with pytest.raises(RuntimeError):
+        writer.flush()
+
+def test_buffered_writer_survives_failing_error_handler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    failures = []
+
+    def on_error(error, batch):
+        failures.append(len(batch))
+        raise RuntimeError('handler failed')
+
+    with Tag().buffered(batch_size=2, flush_interval=10, on_error=on_error) as writer:
+        writer.add(Tag(label='lost'))
+        writer.flush()
+        Tag().create_table()
+        writer.add(Tag(label='kept'))
+        writer.flush()
+
+    assert failures == [1]
+    assert Tag().count() == 1
+
+def test_sqlite_profile_and_pool(tmp_path):
+    connection = SQLIteConnection(str(tmp_path / 'profile.sqlite3'), profile='throughput', pragmas={'cache_size': -1000}, pool_size=1)
+
+    with connection as cursor:
+        cursor.execute('PRAGMA journal_mode;')
+        assert cursor.fetchone()[0] == 'wal'
+        cursor.execute('PRAGMA cache_size;')
+        assert cursor.fetchone()[0] == -1000
+        pooled = connection.conn
+    with connection:
+        assert connection.conn is pooled
+    connection.close()
+
+
+def test_sqlite_busy_retry(tmp_path):
+    database = str(tmp_path / 'busy.sqlite3')
+    connection = SQLIteConnection(database, busy_timeout=0, busy_retries=20, retry_backoff_ms=5, writer_lock=True)
+    connection.run_write(lambda cursor: cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT);'))
+
+    blocker = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+    blocker.execute('BEGIN EXCLUSIVE')
+    timer = threading.Timer(0.05, blocker.rollback)
+    timer.start()
+    connection.run_write(lambda cursor: cursor.execute("INSERT INTO item (name) VALUES ('a');"))
+    timer.join()
+
+    def insert(name):
+        connection.run_write(lambda cursor: cursor.execute('INSERT INTO item (name) VALUES (?);', (name,)))
+
+    threads = [threading.Thread(target=insert, args=(str(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    count = connection.run_read(lambda cursor: cursor.execute('SELECT COUNT(*) FROM item;').fetchone()[0])
+    assert count == 9
+    blocker.close()
+
+
+def test_sqlite_read_only_connection(tmp_path):
+    connection = SQLIteConnection(str(tmp_path / 'ro.sqlite3'), profile='durable')
+    connection.run_write(lambda cursor: cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT);'))
+    connection.run_write(lambda cursor: cursor.execute("INSERT INTO item (name) VALUES ('a');"))
+
+    reader = connection.reader(pool_size=2)
+    assert reader.read_only and reader.pool_size == 2
+    assert reader.run_read(lambda cursor: cursor.execute('SELECT name FROM item;').fetchall()) == [('a',)]
+    with pytest.raises(sqlite3.OperationalError):
+        reader.run_read(lambda cursor: cursor.execute("INSERT INTO item (name) VALUES ('b');"))
+    reader.close()
+
+    snapshot = SQLIteConnection(str(tmp_path / 'ro.sqlite3'), immutable=True)
+    assert snapshot.run_read(lambda cursor: cursor.execute('SELECT COUNT(*) FROM item;').fetchone()[0]) == 1
+
+
+class Note(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    text = fields.CharField(max_length=50)
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+
+def test_replica_router(tmp_path):
+    primary = SQLIteConnection(str(tmp_path / 'primary.sqlite3'))
+    replicas = [SQLIteConnection(str(tmp_path / f'replica{i}.sqlite3')) for i in range(2)]
+    for connection in [primary, *replicas]:
+        Note._meta['rdbms'] = connection
+        Note().create_table()
+    Note._meta['rdbms'] = router = ReplicaRouter(primary, replicas, sticky=True, sticky_seconds=0)
+
+    replicas[0].run_write(lambda cursor: cursor.execute("INSERT INTO note (text) VALUES ('replica');"))
+    assert [Note().count() for _ in range(2)] == [1, 0]
+
+    Note(text='primary').save()
+    assert router.primary.run_read(lambda cursor: cursor.execute('SELECT COUNT(*) FROM note;').fetchone()[0]) == 1
+
+    with router:
+        assert Note().count() == 1
+    with Session():
+        Note(text='session').save()
+        assert Note().count() == 2
+    assert [Note().count() for _ in range(2)] == [1, 0]
+
+    async def write_then_read():
+        await Note(text='async').asave()
+        return await Note().acount()
+
+    router.sticky_seconds = 60
+    assert contextvars.Context().run(asyncio.run, write_then_read()) == 3
+
+
+class Visit(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    user = fields.IntegerField()
+    page = fields.CharField(max_length=50)
+
+    class MetaData:
+        shard_key = 'user'
+
+def test_sharded_model(tmp_path):
+    sharded = ShardedConnection([str(tmp_path / f'shard{i}.sqlite3') for i in range(3)])
+    Visit._meta['rdbms'] = sharded
+    Visit().create_table()
+
+    Visit().bulk_create([Visit(user=user, page='home') for user in range(12)])
+    visit = Visit(user=42, page='about')
+    visit.save()
+    with pytest.raises(ValueError):
+        Visit(page='orphan').save()
+
+    counts = [shard.run_read(lambda cursor: cursor.execute('SELECT COUNT(*) FROM visit;').fetchone()[0]) for shard in sharded.shards]
+    assert sum(counts) == 13 and all(counts)
+    assert Visit().count() == 13
+    assert Visit().count(user=42) == 1
+    assert Visit().get(user=42)['id'] == visit.id
+    assert Visit().get(id=visit.id)['user'] == 42
+    assert len(Visit().filter(page='home')) == 12
+
+    ids = [row['id'] for row in Visit().iterate(chunk_size=5)]
+    assert len(ids) == 13 and ids == sorted(set(ids))
+
+    Visit().bulk_create([Visit(user=100 + i, page='blog') for i in range(17)])
+    ids = [row['id'] for row in Visit().iterate(chunk_size=5)]
+    assert len(ids) == 30 and ids == sorted(set(ids))
+
+    async def aiterate():
+        return [row['id'] async for row in Visit().aiterate(chunk_size=5)]
+
+    assert asyncio.run(aiterate()) == ids
+
+    Visit().update(page='contact', user=42)
+    assert Visit().get(user=42)['page'] == 'contact'
+    with pytest.raises(ValueError):
+        Visit().update(user=2, id=visit.id)
+    assert Visit().filter(user=42)[0]['id'] == visit.id
+    sharded.close()
+
+
+class Stock(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    sku = fields.CharField(max_length=20, unique=True)
+    quantity = fields.IntegerField()
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+
+def test_upsert(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stock().create_table()
+
+    Stock().upsert(Stock(sku='A1', quantity=1), ['sku'])
+    Stock().upsert(Stock(sku='A1', quantity=5), ['sku'])
+    assert Stock().get(sku='A1')['quantity'] == 5
+
+    Stock().bulk_upsert([Stock(sku='A1', quantity=7), Stock(sku='B2', quantity=2)], ['sku'], [])
+    assert Stock().get(sku='A1')['quantity'] == 5
+    assert Stock().count() == 2
+
+
+def test_update_with_f_expression(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stock().create_table()
+    Stock(sku='A1', quantity=0).save()
+
+    threads = [threading.Thread(target=Stock().update, kwargs={'quantity': F('quantity') + 1, 'sku': 'A1'}) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert Stock().get(sku='A1')['quantity'] == 10
+    assert Stock().count(quantity__gt=F('id')) == 1
+
+
+
+
+class Price(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    sku = fields.CharField(max_length=20, unique=True)
+    quantity = fields.IntegerField()
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+        cache = LocalCache()
+
+def test_model_result_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Price._meta['cache'].clear()
+    Price().create_table()
+    connection = Price()._rdbms()
+    run_read = connection.run_read
+    reads = []
+
+    def counted_read(func):
+        reads.append(func)
+        return run_read(func)
+
+    monkeypatch.setattr(connection, 'run_read', counted_read)
+    Price(sku='A', quantity=1).save()
+
+    for _ in range(2):
+        assert Price().get(sku='A')['quantity'] == 1
+        assert len(Price().filter(quantity__gte=0)) == 1
+        assert Price().count() == 1
+    assert len(reads) == 3
+
+    Price(sku='B', quantity=2).save()
+    assert Price().count() == 2
+    Price().update(quantity=5, sku='A')
+    assert Price().get(sku='A')['quantity'] == 5
+    Price().bulk_create([Price(sku='C', quantity=3)])
+    assert len(Price().filter(quantity__gte=0)) == 3
+    Price().upsert(Price(sku='C', quantity=9), ['sku'])
+    assert Price().get(sku='C')['quantity'] == 9
+    Price().delete(1)
+    assert Price().count() == 2
+
+class Invoice(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    amount = fields.DecimalField(max_digits=10, decimal_places=2)
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+
+def test_update_decimal_field(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Invoice().create_table()
+    Invoice(amount=Decimal('1.50')).save()
+
+    Invoice().update(amount=Decimal('2.25'), id=1)
+    assert Invoice().get(id=1)['amount'] == 2.25
+
+def test_filter_lookups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stock().create_table()
+    Stock().bulk_create([Stock(sku=sku, quantity=i) for i, sku in enumerate(['AB1', 'AB2', 'ac3', 'B_4'])])
+
+    assert [row['sku'] for row in Stock().filter(sku__startswith='AB')] == ['AB1', 'AB2']
+    assert [row['sku'] for row in Stock().filter(sku__contains='_')] == ['B_4']
+    assert len(Stock().filter(sku__icontains='a')) == 3
+    assert Stock().count(id__in=list(range(1, 3000))) == 4
+    assert Stock().count(id__in=[1, 3], sku__ne='AB1') == 1
+
+
+def test_filter_with_q_objects(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stock().create_table()
+    Stock().bulk_create([Stock(sku=sku, quantity=i) for i, sku in enumerate(['A', 'B', 'C'])])
+
+    assert [row['sku'] for row in Stock().filter(Q(sku='A') | Q(quantity__gte=2))] == ['A', 'C']
+    assert Stock().count(~Q(sku='A'), quantity__lt=2) == 1
+    assert Stock().get(Q(sku='B') | Q(sku='Z'))['quantity'] == 1
+
+
+def test_get_stops_after_two_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stock().create_table()
+    Stock().bulk_create([Stock(sku=f'S{i}', quantity=1) for i in range(5)])
+
+    with pytest.raises(ValueError, match='Multiple'):
+        Stock().get(quantity=1)
+    assert Stock().get(id=3)['sku'] == 'S2'
+
+
+class Article(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    title = fields.CharField(max_length=100)
+    body = fields.TextField(max_length=1000)
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+        search_fields = ['title', 'body']
+
+def test_full_text_search(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Article().create_table()
+    Article().bulk_create([
+        Article(title='SQLite tips', body='Use FTS5 for full text search in SQLite.'),
+        Article(title='Cooking', body='A recipe with no database at all.'),
+        Article(title='Search engines', body='Ranking search results with bm25.'),
+    ])
+
+    rows = Article().search('search', limit=5)
+    assert [row['title'] for row in rows] == ['Search engines', 'SQLite tips']
+    assert '<b>search</b>' in rows[0]['snippet'].lower()
+
+    Article().update(body='Nothing relevant here.', title='Search engines')
+    Article().delete(1)
+    assert Article().search('bm25') == []
+    assert [row['title'] for row in Article().search('search')] == ['Search engines']
+    assert len(Article().search('recipe OR nothing', rank=False)) == 2
+
+    with Session():
+        assert Article().search('nothing')[0]['id'] == 3
+        assert 'rank' not in Article().get(id=3)
+
+
+
+class Entry(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    author = fields.IntegerField()
+    body = fields.TextField(max_length=1000)
+
+    class MetaData:
+        shard_key = 'author'
+        search_fields = ['body']
+
+def test_sharded_search_limit(tmp_path):
+    sharded = ShardedConnection([str(tmp_path / f'entries{i}.sqlite3') for i in range(3)])
+    Entry._meta['rdbms'] = sharded
+    Entry().create_table()
+    Entry().bulk_create([Entry(author=author, body='hello world') for author in range(9)])
+
+    assert len(Entry().search('hello', rank=False)) == 9
+    assert len(Entry().search('hello', rank=False, limit=3)) == 3
+    assert len(Entry().search('hello', limit=3)) == 3
+    sharded.close()
+
+class Payload(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    data = fields.JSONField()
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+        generated_columns = {'user_id': 'data__user__id'}
+
+def test_json_field(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Payload().create_table()
+    Payload().bulk_create([Payload(data={'user': {'id': i}, 'tags': ['a', f't{i}']}) for i in range(5)])
+
+    assert Payload().get(data__user__id=3)['data'] == {'user': {'id': 3}, 'tags': ['a', 't3']}
+    assert Payload().count(data__tags__1__in=['t1', 't2']) == 2
+    assert Payload().count(data__user__id__gte=2) == 3
+
+    Payload().update(data={'user': {'id': 9}}, id=1)
+    assert Payload().get(user_id=9)['id'] == 1
+    with Payload()._rdbms() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN SELECT * FROM payload WHERE user_id = 9;')
+        assert 'payload_user_id' in str(cursor.fetchall())
+
+
+
+class Folder(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    name = fields.CharField(max_length=50)
+
+class Doc(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    folder = fields.ForeignKey(to=Folder)
+    data = fields.JSONField()
+
+def test_json_field_through_loader_and_prefetch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Folder().create_table()
+    Doc().create_table()
+    Folder(name='inbox').save()
+    Doc(folder=1, data={'tags': ['a']}).save()
+
+    with Doc().batch() as loader:
+        pending = loader.load(1)
+    assert pending.result()['data'] == {'tags': ['a']}
+    assert Folder().prefetch_related('doc_set').get(id=1)['doc_set'][0]['data'] == {'tags': ['a']}
+
+class Media(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    name = fields.CharField(max_length=50)
+    content = fields.BinaryField()
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+
+def test_blob_streaming(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Media().create_table()
+    media = Media(name='thumbnail', content=b'small')
+    media.save()
+    assert Media().get(id=media.id)['content'] == b'small'
+
+    payload = bytes(range(256)) * 1000
+    Media().write_blob('content', media.id, io.BytesIO(payload), size=len(payload), chunk_size=4096)
+
+    out = io.BytesIO()
+    assert Media().read_blob('content', media.id, out, chunk_size=5000) == len(payload)
+    assert out.getvalue() == payload
+
+    buffer = bytearray(len(payload))
+    Media().read_blob('content', media.id, buffer)
+    assert buffer == payload
+
+    with Media().open_blob('content', media.id) as blob:
+        blob.seek(256)
+        assert blob.read(4) == bytes(range(4))
+        assert len(blob) == len(payload)
+
+    with pytest.raises(ValueError):
+        Media().write_blob('content', media.id, io.BytesIO(b'short'), size=10)
+    with pytest.raises(ValueError):
+        Media().read_blob('name', media.id, out)
+    assert Media().get(id=media.id)['content'] == payload
+
+
+class Document(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    body = fields.TextField(max_length=100000, compress=True, threshold=100)
+
+    class MetaData:
+        rdbms = SQLIteConnection()
+
+def test_compressed_text_field(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Document().create_table()
+    text = 'lorem ipsum dolor sit amet ' * 200
+    document = Document(body=text)
+    document.save()
+    Document(body='short').save()
+
+    with Document()._rdbms() as cursor:
+        cursor.execute('SELECT body FROM document ORDER BY id;')
+        stored, short = [row[0] for row in cursor.fetchall()]
+    assert stored[:2] == b'\x00Z' and len(stored) < len(text)
+    assert short == 'short'
+    assert Document().get(id=document.id)['body'] == text
+    assert [row['body'] for row in Document().filter(id__gte=1)] == [text, 'short']
+
+    with Document().batch() as loader:
+        pending = loader.load(document.id)
+    assert pending.result()['body'] == text
+    with pytest.raises(ValueError):
+        Document().filter(body=text)
+    with pytest.raises(ValueError):
+        Document().count(body__contains='lorem')
+    assert Document().count(body__isnull=False) == 2
+
+    Document().update(body=text.upper(), id=2)
+    assert Document().get(id=2)['body'] == text.upper()
+
+    with Document()._rdbms() as cursor:
+        cursor.execute('INSERT INTO document (body) VALUES (?);', (text,))
+        cursor.execute('INSERT INTO document (body) VALUES (?);', (text.encode(),))
+    assert Document().compact(batch_size=2, vacuum=True) == 2
+    assert Document().compact() == 0
+    assert Document().get(id=3)['body'] == text
+    assert Document().get(id=4)['body'] == text
+
+    with pytest.raises(ValueError):
+        fields.TextField(max_length=10, compress=True, algorithm='brotli')
@@ -12,9 +12,10 @@ for root, dirs, files in os.walk(path):
 
 from spider.models import Model
 from spider import fields
-from spider.sql_utils import SQLTypeGenerator, TableSQL
+from spider.sql_utils import SQLTypeGenerator, TableSQL, MAX_QUERY_PARAMS
 from spider.mysql.connection import MysqlConnection
 from spider.sqlite.sqlite_connection import SQLIteConnection
+from spider.expressions import F, Coalesce, Q
 
 class DummyModel(Model):
     """
@@ -302,7 +303,7 @@ def test_mysql_create_table():
     sql_password_table = model.create_password_table()
 
     expected_sql_password_table = (
-        'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR(32) NOT NULL, salt VARCHAR(16) NOT NULL);'
+        'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR(255) NOT NULL, salt VARCHAR(32) NOT NULL);'
     )
     expected_sql = (
         'CREATE TABLE IF NOT EXISTS dummymodel ('
@@ -330,7 +331,7 @@ def test_sqlite_create_table():
     sql_password_table = model.create_password_table()
 
     expected_sql_password_table = (
-        'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR(32) NOT NULL, salt VARCHAR(16) NOT NULL);'
+        'CREATE TABLE IF NOT EXISTS passwords (id INTEGER PRIMARY KEY, hash VARCHAR(255) NOT NULL, salt VARCHAR(32) NOT NULL);'
     )
     expected_sql = (
         'CREATE TABLE IF NOT EXISTS dummymodel ('
@@ -506,3 +507,203 @@ def test_sqlite_delete_data():
     expected_value = 1
     assert sqlite_query == sqlite_expected_query
     assert sqlite_values[0] == expected_value
+
+def test_sqlite_select_in_chunks():
+    """
+    Testa a divisão da consulta IN em blocos abaixo do limite de parâmetros.
+
+    Verifica se cada declaração SQL tem no máximo MAX_QUERY_PARAMS valores.
+    """
+    instance = DummyModel()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    queries = TableSQL.select_in_sql(instance, 'dummymodel', 'id', list(range(MAX_QUERY_PARAMS + 1)))
+
+    assert len(queries) == 2
+    assert len(queries[0][1]) == MAX_QUERY_PARAMS
+    assert queries[1] == ('SELECT * FROM dummymodel WHERE id IN (?);', [MAX_QUERY_PARAMS])
+
+class DummyTag(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+
+class DummyPost(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    tags = fields.ManyToManyField(to=DummyTag, related_name='posts')
+
+def test_sqlite_create_m2m_tables():
+    """
+    Testa a geração das declarações SQL da tabela de junção de um ManyToManyField no SQLite.
+
+    Verifica a chave primária composta e o índice reverso.
+    """
+    instance = DummyPost()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.create_table_sql(instance)[0] == 'CREATE TABLE IF NOT EXISTS dummypost (id INTEGER PRIMARY KEY AUTOINCREMENT);'
+    assert TableSQL.create_m2m_tables_sql(instance) == [
+        'CREATE TABLE IF NOT EXISTS dummypost_tags ('
+        'dummypost_id INTEGER NOT NULL REFERENCES dummypost(id) ON DELETE CASCADE,'
+        'dummytag_id INTEGER NOT NULL REFERENCES dummytag(id) ON DELETE CASCADE,'
+        'PRIMARY KEY (dummypost_id,dummytag_id)) WITHOUT ROWID;',
+        'CREATE INDEX IF NOT EXISTS dummypost_tags_dummytag_id ON dummypost_tags (dummytag_id,dummypost_id);',
+    ]
+
+def test_mysql_m2m_add():
+    """
+    Testa a geração da inserção em massa na tabela de junção no MySQL.
+
+    Verifica se todas as ligações são escritas numa única declaração.
+    """
+    instance = DummyPost()
+    instance._meta['rdbms'] = MysqlConnection(host='0.0.0.0', user='root', password='root')
+
+    queries = TableSQL.m2m_add_sql(instance, 'dummypost_tags', 'dummypost_id', 'dummytag_id', 1, [2, 3])
+
+    assert queries == [(
+        'INSERT IGNORE INTO dummypost_tags (dummypost_id,dummytag_id) VALUES (%s,%s),(%s,%s);',
+        [1, 2, 1, 3]
+    )]
+
+def test_sqlite_count_data():
+    """
+    Testa a geração da declaração SQL para contar registros no SQLite.
+
+    Verifica a contagem com e sem critérios de filtro.
+    """
+    instance = DummyModel()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.count_data_sql(instance, {}) == ('SELECT COUNT(*) FROM dummymodel;', [])
+    assert TableSQL.count_data_sql(instance, {'age__gte': 18}) == ('SELECT COUNT(*) FROM dummymodel WHERE age >= ?', [18])
+
+class DummyProduct(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    sku = fields.CharField(max_length=20, unique=True)
+    price = fields.IntegerField()
+
+def test_upsert_data():
+    """
+    Testa a geração do upsert no SQLite e no MySQL.
+
+    Verifica a cláusula de conflito de cada banco e a atualização dos campos pedidos.
+    """
+    instance = DummyProduct(sku='A1', price=10)
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.upsert_data_sql(instance, ['sku']) == (
+        'INSERT INTO dummyproduct (sku,price) VALUES (?,?) ON CONFLICT (sku) DO UPDATE SET price = excluded.price;', ['A1', 10]
+    )
+    assert TableSQL.upsert_data_sql(instance, ['sku'], []) == (
+        'INSERT INTO dummyproduct (sku,price) VALUES (?,?) ON CONFLICT (sku) DO NOTHING;', ['A1', 10]
+    )
+
+    instance._meta['rdbms'] = MysqlConnection(host='0.0.0.0', user='root', password='root')
+    assert TableSQL.upsert_data_sql(instance, ['sku'], ['price']) == (
+        'INSERT INTO dummyproduct (sku,price) VALUES (%s,%s) ON DUPLICATE KEY UPDATE price = VALUES(price);', ['A1', 10]
+    )
+    instance._meta['rdbms'] = SQLIteConnection()
+
+def test_update_with_expression():
+    """
+    Testa a geração da atualização com expressões calculadas pelo banco.
+
+    Verifica que o novo valor é passado como parâmetro e que F e Coalesce são compilados em SQL.
+    """
+    instance = DummyProduct()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL().update_data_sql(instance, {'price': 5, 'id': 1}) == (
+        'UPDATE dummyproduct SET price = ? WHERE id = ? ', [5, 1]
+    )
+    assert TableSQL().update_data_sql(instance, {'price': Coalesce(F('price'), 0) * 2 + 1, 'id': 1}) == (
+        'UPDATE dummyproduct SET price = ((COALESCE(price, ?) * ?) + ?) WHERE id = ? ', [0, 2, 1, 1]
+    )
+    assert TableSQL.where_sql(instance, {'price__lt': F('id') + 1}) == ('price < (id + ?)', [1])
+
+def test_where_lookups():
+    """
+    Testa a geração das condições __in, __startswith, __contains, __icontains, __isnull e __ne.
+
+    Verifica que __startswith vira um intervalo e que listas __in muito grandes usam um único parâmetro.
+    """
+    instance = DummyProduct()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.where_sql(instance, {'id__in': [1, 2], 'sku__startswith': 'ab', 'price__isnull': False, 'sku__ne': 'x'}) == (
+        'id IN (?,?) AND sku >= ? AND sku < ? AND price IS NOT NULL AND sku <> ?', [1, 2, 'ab', 'ac', 'x']
+    )
+    assert TableSQL.where_sql(instance, {'sku__contains': 'a_', 'sku__icontains': '50%'}) == (
+        "instr(sku, ?) > 0 AND LOWER(sku) LIKE LOWER(?) ESCAPE '\\'", ['a_', '%50\\%%']
+    )
+    assert TableSQL.where_sql(instance, {'id__in': []}) == ('1 = 0', [])
+
+    where, values = TableSQL.where_sql(instance, {'id__in': range(MAX_QUERY_PARAMS + 1)})
+    assert where == 'id IN (SELECT value FROM json_each(?))' and len(values) == 1
+
+def test_filter_with_q_objects():
+    """
+    Testa a geração de condições OR e NOT com objetos Q.
+
+    Verifica que os objetos Q são compilados numa única cláusula WHERE junto dos outros critérios.
+    """
+    instance = DummyProduct()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    query, values = TableSQL.filter_data_sql(instance, {'price__gt': 0}, (Q(sku='a') | ~Q(sku__startswith='b', price=1),))
+    assert query == 'SELECT * FROM dummyproduct WHERE price > ? AND ((sku = ?) OR NOT (sku >= ? AND sku < ? AND price = ?))'
+    assert values == [0, 'a', 'b', 'c', 1]
+
+def test_get_statements():
+    """
+    Testa a geração das declarações usadas por get.
+
+    Verifica a declaração por chave primária, construída uma única vez, e o LIMIT das outras buscas.
+    """
+    instance = DummyProduct()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.select_pk_sql(instance) == 'SELECT * FROM dummyproduct WHERE id = ?;'
+    assert TableSQL.select_pk_sql(instance) is TableSQL.select_pk_sql(instance)
+    assert TableSQL.filter_data_sql(instance, {'sku': 'a'}, limit=2) == ('SELECT * FROM dummyproduct WHERE sku = ? LIMIT 2', ['a'])
+
+class DummyPayload(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    data = fields.JSONField()
+
+def test_json_path_lookups():
+    """
+    Testa a compilação das buscas por caminho num JSONField.
+
+    Verifica o uso de json_extract no SQLite e do operador ->> no MySQL.
+    """
+    instance = DummyPayload()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert TableSQL.where_sql(instance, {'data__user__id': 5, 'data__tags__0__ne': 'a'}) == (
+        "json_extract(data, '$.user.id') = ? AND json_extract(data, '$.tags[0]') <> ?", [5, 'a']
+    )
+
+    instance._meta['rdbms'] = MysqlConnection(host='0.0.0.0', user='root', password='root')
+    assert TableSQL.column_sql(instance, 'data__user__id') == "data->>'$.user.id'"
+    instance._meta['rdbms'] = SQLIteConnection()
+
+class DummyArticle(Model):
+    id = fields.IntegerField(primary_key=True, auto_increment=True)
+    body = fields.TextField(max_length=100000, compress=True)
+
+def test_compressed_text_field_sql():
+    """
+    Testa o SQL gerado para um TextField comprimido.
+
+    Verifica o tipo BLOB da coluna, a regravação das colunas por chave primária e o VACUUM.
+    """
+    instance = DummyArticle()
+    instance._meta['rdbms'] = SQLIteConnection()
+
+    assert 'body LONGBLOB' in TableSQL.create_table_sql(instance)[0]
+    assert TableSQL.update_columns_sql(instance, ['body']) == 'UPDATE dummyarticle SET body = ? WHERE id = ?;'
+    assert TableSQL.vacuum_sql(instance) == 'VACUUM;'
+
+    instance._meta['rdbms'] = MysqlConnection(host='0.0.0.0', user='root', password='root')
+    assert TableSQL.vacuum_sql(instance) == 'OPTIMIZE TABLE dummyarticle;'
+    instance._meta['rdbms'] = SQLIteConnection()